@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import APIKey, Application, IPBlacklist
+from .models import APIKey, Application, IPBlacklist, IPNetworkBlacklist
 
 class ApplicationAdmin(admin.ModelAdmin):
     list_display = ('name', 'description', 'created_on')
@@ -20,6 +20,12 @@ class IPBlacklistAdmin(admin.ModelAdmin):
     search_fields = ("ip_address",)
     list_filter = ("permanently_blacklisted",)
 
+class IPNetworkBlacklistAdmin(admin.ModelAdmin):
+    list_display = ("network", "is_active", "reason", "created_on", "updated_on")
+    search_fields = ("network", "reason")
+    list_filter = ("is_active",)
+
 admin.site.register(Application, ApplicationAdmin)
 admin.site.register(APIKey, APIKeyAdmin)
-admin.site.register(IPBlacklist, IPBlacklistAdmin)
\ No newline at end of file
+admin.site.register(IPBlacklist, IPBlacklistAdmin)
+admin.site.register(IPNetworkBlacklist, IPNetworkBlacklistAdmin)
\ No newline at end of file
@@ -0,0 +1,64 @@
+import time
+from collections import namedtuple
+from django.core.cache import cache
+
+# Immutable view of the APIKey fields the auth and throttling code needs.
+ResolvedAPIKey = namedtuple("ResolvedAPIKey", ["id", "key", "is_active", "rate_limit", "rate_limit_period"])
+
+SHARED_CACHE_KEY = "api_key:{key}"
+# invalidate_api_key() clears the local and shared entries of the process that
+# saved the key. Other workers keep serving a deactivated or regenerated key
+# until their local entry lapses (LOCAL_CACHE_TTL) when the cache is shared,
+# and until the shared entry lapses as well (LOCAL_CACHE_TTL +
+# SHARED_CACHE_TIMEOUT, 40 s) with a per-process cache such as LocMem.
+SHARED_CACHE_TIMEOUT = 30
+LOCAL_CACHE_TTL = 10
+LOCAL_CACHE_MAX_SIZE = 1024
+MISSING = "missing"  # cached marker for keys that do not exist
+
+_local_cache = {}
+
+def _load_api_key(key):
+    from .models import APIKey
+    row = (
+        APIKey.objects
+        .filter(key=key)
+        .values_list("id", "key", "is_active", "rate_limit", "rate_limit_period")
+        .first()
+    )
+    return ResolvedAPIKey(*row) if row else MISSING
+
+def get_api_key(key):
+    """
+    Resolve an API key string through the in-process TTL cache, then the shared
+    cache, and only then the database. Returns None for unknown keys.
+    """
+    now = time.monotonic()
+    entry = _local_cache.get(key)
+    if entry is not None and entry[0] > now:
+        resolved = entry[1]
+    else:
+        shared_key = SHARED_CACHE_KEY.format(key=key)
+        resolved = cache.get(shared_key)
+        if resolved is None:
+            resolved = _load_api_key(key)
+            cache.set(shared_key, resolved, timeout=SHARED_CACHE_TIMEOUT)
+        if len(_local_cache) >= LOCAL_CACHE_MAX_SIZE:
+            _local_cache.clear()
+        _local_cache[key] = (now + LOCAL_CACHE_TTL, resolved)
+    return None if resolved == MISSING else resolved
+
+def resolve_api_key(request):
+    """Resolve the request's X-API-KEY header at most once per request."""
+    http_request = getattr(request, "_request", request)
+    if not hasattr(http_request, "_resolved_api_key"):
+        key = request.headers.get("X-API-KEY")
+        http_request._resolved_api_key = get_api_key(key) if key else None
+    return http_request._resolved_api_key
+
+def invalidate_api_key(*keys):
+    for key in keys:
+        if not key:
+            continue
+        _local_cache.pop(key, None)
+        cache.delete(SHARED_CACHE_KEY.format(key=key))
@@ -1,6 +1,43 @@
+from functools import partial
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from .models import APIKey
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .api_keys import resolve_api_key
+
+DISABLED_USER_CACHE_KEY = "user_disabled_{user_id}"
+DISABLED_USER_CACHE_TTL = 60
+
+def is_user_disabled(user_id):
+    """Whether the user is inactive or gone, cached briefly and refreshed by the User signals."""
+    cache_key = DISABLED_USER_CACHE_KEY.format(user_id=user_id)
+    disabled = cache.get(cache_key)
+    if disabled is None:
+        disabled = not User.objects.filter(id=user_id, is_active=True).exists()
+        cache.set(cache_key, disabled, timeout=DISABLED_USER_CACHE_TTL)
+    return disabled
+
+def set_user_disabled(user_id, disabled):
+    cache.set(DISABLED_USER_CACHE_KEY.format(user_id=user_id), disabled, timeout=DISABLED_USER_CACHE_TTL)
+
+def _refresh_all_deferred(user, using=None, fields=None):
+    deferred = user.get_deferred_fields()
+    if fields is not None and deferred and set(fields) <= deferred:
+        fields = list(deferred)
+    User.refresh_from_db(user, using=using, fields=fields)
+
+def lazy_user(user_id):
+    """
+    User built from a token's user id without a query. It is a plain User
+    instance, so save() and delete() send the usual User signals; the row is
+    loaded, in full, the first time anything other than the id is accessed.
+    """
+    user = User.from_db(None, ["id"], [User._meta.pk.to_python(user_id)])
+    user.refresh_from_db = partial(_refresh_all_deferred, user)
+    return user
 
 class APIKeyAuthentication(BaseAuthentication):
     def authenticate(self, request):
@@ -8,11 +45,25 @@ class APIKeyAuthentication(BaseAuthentication):
         if not key:
             return None  # No header
 
-        try:
-            api_key = APIKey.objects.get(key=key, is_active=True)
-        except APIKey.DoesNotExist:
+        api_key = resolve_api_key(request)
+        if not api_key or not api_key.is_active:
             raise AuthenticationFailed('Invalid API key')
 
         return None
 
-        
\ No newline at end of file
+class LazyJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the per-request User query. request.user is a
+    lazy_user() carrying the token's user id; inactive and deleted users are
+    rejected through the disabled-user cache.
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        if is_user_disabled(user_id):
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        return lazy_user(user_id)
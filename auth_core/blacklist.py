@@ -0,0 +1,245 @@
+import atexit
+import ipaddress
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "ip_blacklist_generation"
+SYNC_OVERLAP = timedelta(seconds=5)  # re-read a little history to absorb clock skew
+PERMANENT_BLACKLIST_THRESHOLD = 15  # temporary blacklistings before an IP is banned for good
+
+def bump_blacklist_version(full=False):
+    """
+    Signal that blacklist rows changed. Saves are picked up by the next
+    incremental sync; deletions (full=True) also force a reload. Other
+    processes only see the generation token through a shared cache, and fall
+    back to their periodic full reload otherwise.
+    """
+    if full:
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+    permanent_blacklist.expire()
+
+class PrefixTrie:
+    """
+    Binary radix trie of IPv4 and IPv6 networks. A lookup walks at most one
+    node per prefix bit and stops at the first blacklisted prefix.
+    """
+    def __init__(self):
+        # node layout: [child_for_0, child_for_1, is_terminal]
+        self._roots = {4: [None, None, False], 6: [None, None, False]}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _bits(self, value, max_bits, length):
+        for shift in range(max_bits - 1, max_bits - 1 - length, -1):
+            yield (value >> shift) & 1
+
+    def add(self, network):
+        network = ipaddress.ip_network(network, strict=False)
+        node = self._roots[network.version]
+        for bit in self._bits(int(network.network_address), network.max_prefixlen, network.prefixlen):
+            if node[bit] is None:
+                node[bit] = [None, None, False]
+            node = node[bit]
+        if not node[2]:
+            node[2] = True
+            self._size += 1
+
+    def remove(self, network):
+        network = ipaddress.ip_network(network, strict=False)
+        node = self._roots[network.version]
+        for bit in self._bits(int(network.network_address), network.max_prefixlen, network.prefixlen):
+            node = node[bit]
+            if node is None:
+                return
+        if node[2]:
+            node[2] = False
+            self._size -= 1
+
+    def __contains__(self, address):
+        try:
+            address = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        node = self._roots[address.version]
+        value = int(address)
+        shift = address.max_prefixlen
+        while not node[2]:
+            shift -= 1
+            if shift < 0:
+                return False
+            node = node[(value >> shift) & 1]
+            if node is None:
+                return False
+        return True
+
+class PermanentBlacklist:
+    """
+    In-memory copy of the permanent blacklist: exact addresses in a set and
+    CIDR ranges in a PrefixTrie. Every `refresh_interval` seconds the rows
+    updated since the last sync are read back (an indexed `updated_on` range
+    per table), so a ban written by any process is enforced here within that
+    interval whatever cache backend is configured; in between, the common
+    "not blacklisted" check does no I/O at all. Deletions cannot be seen
+    that way, so the set is rebuilt when the generation token changes and
+    at least every `full_reload_interval` seconds.
+    """
+    refresh_interval = 5
+    full_reload_interval = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ips = None
+        self._networks = PrefixTrie()
+        self._generation = None
+        self._synced_at = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    def expire(self):
+        self._checked_at = 0.0
+
+    def _full_load(self):
+        from .models import IPBlacklist, IPNetworkBlacklist
+        synced_at = timezone.now()
+        ips = set(
+            IPBlacklist.objects
+            .filter(permanently_blacklisted=True)
+            .values_list("ip_address", flat=True)
+        )
+        networks = PrefixTrie()
+        for network in IPNetworkBlacklist.objects.filter(is_active=True).values_list("network", flat=True):
+            networks.add(network)
+        self._ips, self._networks, self._synced_at = ips, networks, synced_at
+
+    def _apply_changes(self):
+        from .models import IPBlacklist, IPNetworkBlacklist
+        synced_at = timezone.now()
+        since = self._synced_at - SYNC_OVERLAP
+        changed_ips = (
+            IPBlacklist.objects
+            .filter(updated_on__gte=since)
+            .values_list("ip_address", "permanently_blacklisted")
+        )
+        for ip, permanent in changed_ips:
+            if permanent:
+                self._ips.add(ip)
+            else:
+                self._ips.discard(ip)
+        changed_networks = (
+            IPNetworkBlacklist.objects
+            .filter(updated_on__gte=since)
+            .values_list("network", "is_active")
+        )
+        for network, is_active in changed_networks:
+            if is_active:
+                self._networks.add(network)
+            else:
+                self._networks.remove(network)
+        self._synced_at = synced_at
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._ips is not None and now - self._checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self._ips is not None and now - self._checked_at < self.refresh_interval:
+                return
+            generation = cache.get(GENERATION_KEY)
+            if (
+                self._ips is None
+                or generation != self._generation
+                or now - self._loaded_at >= self.full_reload_interval
+            ):
+                self._full_load()
+                self._loaded_at = now
+            else:
+                self._apply_changes()
+            self._generation = generation
+            self._checked_at = now
+
+    def __contains__(self, ip):
+        self._refresh()
+        return ip in self._ips or (len(self._networks) > 0 and ip in self._networks)
+
+permanent_blacklist = PermanentBlacklist()
+
+class ViolationFlushBuffer:
+    """
+    Collect temporary-blacklist events in memory and persist them from a
+    background thread every `flush_interval` seconds: one bulk insert for new
+    IPs, then one increment per IP, instead of writes inside the request.
+    Pending events are flushed at interpreter exit.
+    """
+    flush_interval = 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._thread = None
+        atexit.register(self.flush)
+
+    def add(self, ip):
+        with self._lock:
+            self._pending[ip] += 1
+        self.start()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ip-blacklist-flush", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to persist IP blacklist violations")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        from .models import IPBlacklist
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+
+        now = timezone.now()
+        with transaction.atomic():
+            IPBlacklist.objects.bulk_create(
+                [IPBlacklist(ip_address=ip, blacklist_count=0) for ip in pending],
+                ignore_conflicts=True,
+            )
+            for ip, count in pending.items():
+                # permanently_blacklisted is assigned before blacklist_count so
+                # every backend (MySQL included) compares against the old count.
+                IPBlacklist.objects.filter(ip_address=ip).update(
+                    permanently_blacklisted=Case(
+                        When(blacklist_count__gte=PERMANENT_BLACKLIST_THRESHOLD - count, then=Value(True)),
+                        default=F("permanently_blacklisted"),
+                    ),
+                    blacklist_count=F("blacklist_count") + count,
+                    updated_on=now,
+                )
+        bump_blacklist_version()
+        return len(pending)
+
+violation_buffer = ViolationFlushBuffer()
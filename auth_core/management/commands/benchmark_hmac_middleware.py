@@ -0,0 +1,49 @@
+import hashlib
+import hmac
+import time
+import uuid
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+from auth_core.middleware import HMACAuthMiddleware
+
+class Command(BaseCommand):
+    help = "Measure HMACAuthMiddleware overhead per request."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000)
+        parser.add_argument("--path", default="/api/quiz/get_my_quizzes/?page=1")
+
+    def signed_request(self, factory, path, timestamp):
+        nonce = uuid.uuid4().hex
+        body_hash = hashlib.sha256(b"").hexdigest()
+        signature = hmac.new(
+            settings.HMAC_SECRET_KEY.encode(), f"{timestamp}:{nonce}:GET:{path}:{body_hash}".encode(), hashlib.sha256
+        ).hexdigest()
+        return factory.get(path, HTTP_X_SIGNATURE=signature, HTTP_X_TIMESTAMP=str(timestamp), HTTP_X_NONCE=nonce)
+
+    def timed(self, requests, handler):
+        started = time.perf_counter()
+        for request in requests:
+            handler(request)
+        return (time.perf_counter() - started) / len(requests) * 1e6
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        middleware = HMACAuthMiddleware(lambda request: HttpResponse())
+        count = options["requests"]
+        path = options["path"]
+        now = int(time.time())
+
+        signed = [self.signed_request(factory, path, now) for _ in range(count)]
+        exempt = [factory.get("/admin/login/") for _ in range(count)]
+
+        signed_us = self.timed(signed, lambda request: middleware.process_view(request, None, (), {}))
+        exempt_us = self.timed(exempt, lambda request: middleware.process_view(request, None, (), {}))
+        resolve_us = self.timed(signed, lambda request: resolve(request.path))
+
+        self.stdout.write(f"signed request:        {signed_us:8.1f} us")
+        self.stdout.write(f"exempt path:           {exempt_us:8.1f} us")
+        self.stdout.write(f"resolve() (removed):   {resolve_us:8.1f} us")
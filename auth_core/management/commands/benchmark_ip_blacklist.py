@@ -0,0 +1,64 @@
+import ipaddress
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from auth_core.blacklist import PermanentBlacklist
+from auth_core.models import IPBlacklist, IPNetworkBlacklist
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-row IPBlacklist query with the in-memory set and prefix trie. "
+        "Test rows are inserted inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000, help="Exact blacklisted addresses to insert.")
+        parser.add_argument("--networks", type=int, default=5000, help="CIDR ranges to insert.")
+        parser.add_argument("--lookups", type=int, default=2000, help="Lookups to time per strategy.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        with transaction.atomic():
+            IPBlacklist.objects.bulk_create(
+                [
+                    IPBlacklist(ip_address=str(ipaddress.IPv4Address(rng.getrandbits(32))), permanently_blacklisted=True)
+                    for _ in range(options["rows"])
+                ],
+                ignore_conflicts=True,
+            )
+            IPNetworkBlacklist.objects.bulk_create(
+                [
+                    IPNetworkBlacklist(network=str(ipaddress.ip_network((rng.getrandbits(32), 24), strict=False)))
+                    for _ in range(options["networks"] // 2)
+                ]
+                + [
+                    IPNetworkBlacklist(network=str(ipaddress.ip_network((rng.getrandbits(128), 64), strict=False)))
+                    for _ in range(options["networks"] // 2)
+                ],
+                ignore_conflicts=True,
+            )
+            addresses = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(options["lookups"])]
+
+            started = time.perf_counter()
+            for ip in addresses:
+                IPBlacklist.objects.filter(ip_address=ip, permanently_blacklisted=True).exists()
+            query_seconds = time.perf_counter() - started
+
+            blacklist = PermanentBlacklist()
+            started = time.perf_counter()
+            blacklist._full_load()
+            load_seconds = time.perf_counter() - started
+            blacklist._checked_at = time.monotonic()
+
+            started = time.perf_counter()
+            for ip in addresses:
+                ip in blacklist
+            memory_seconds = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+
+        lookups = options["lookups"]
+        self.stdout.write(f"per-row query:   {query_seconds / lookups * 1e6:10.1f} us/lookup")
+        self.stdout.write(f"set + trie:      {memory_seconds / lookups * 1e6:10.1f} us/lookup")
+        self.stdout.write(f"initial load:    {load_seconds * 1000:10.1f} ms (once per process)")
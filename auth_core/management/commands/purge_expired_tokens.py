@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired OutstandingToken rows and their BlacklistedToken entries in small "
+        "batches, each in its own short statement, so the token tables are never locked for long."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Outstanding tokens deleted per batch.")
+        parser.add_argument("--sleep", type=float, default=0.1, help="Seconds to pause between batches.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the expired tokens.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        cutoff = timezone.now()
+        expired = OutstandingToken.objects.filter(expires_at__lt=cutoff)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{expired.count()} expired outstanding tokens would be purged.")
+            return
+
+        purged_outstanding = purged_blacklisted = 0
+        last_id = 0
+        while True:
+            # Walk the primary key so each batch is an index range scan.
+            ids = list(
+                expired
+                .filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            purged_blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            purged_outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {purged_outstanding} outstanding and {purged_blacklisted} blacklisted tokens."
+        ))
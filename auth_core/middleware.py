@@ -1,47 +1,168 @@
+from collections import OrderedDict
 from django.http import JsonResponse
-import hmac, hashlib, time
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+import hmac, hashlib, threading, time
 from django.conf import settings
-from django.urls import resolve
+
+class PathScopedMiddleware:
+    """
+    Run settings.BROWSER_MIDDLEWARE (sessions, CSRF, auth, messages, ...) only
+    for browser routes such as /admin/. Requests under
+    settings.LEAN_MIDDLEWARE_PREFIXES skip that stack entirely; the JSON API
+    authenticates with JWT and API keys and never touches sessions.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lean_prefixes = tuple(settings.LEAN_MIDDLEWARE_PREFIXES)
+        self.view_hooks = []
+        self.template_response_hooks = []
+        self.exception_hooks = []
+
+        handler = get_response
+        for middleware_path in reversed(settings.BROWSER_MIDDLEWARE):
+            middleware = import_string(middleware_path)(handler)
+            # Same hook ordering as django.core.handlers.base.BaseHandler.load_middleware
+            if hasattr(middleware, 'process_view'):
+                self.view_hooks.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self.template_response_hooks.append(middleware.process_template_response)
+            if hasattr(middleware, 'process_exception'):
+                self.exception_hooks.append(middleware.process_exception)
+            handler = middleware
+        self.browser_handler = handler
+
+    def is_lean(self, request):
+        return request.path_info.startswith(self.lean_prefixes)
+
+    def __call__(self, request):
+        if self.is_lean(request):
+            return self.get_response(request)
+        return self.browser_handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_lean(request):
+            return None
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if not self.is_lean(request):
+            for hook in self.template_response_hooks:
+                response = hook(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if self.is_lean(request):
+            return None
+        for hook in self.exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
 
 class HMACAuthMiddleware:
+    """
+    Verify X-Signature = HMAC-SHA256 over
+    "{X-Timestamp}:{X-Nonce}:{METHOD}:{full path}:{sha256(body)}". The nonce is
+    unique per request, so two identical calls in the same second stay
+    distinct, while a captured request cannot be replayed.
+
+    Until every client sends X-Nonce, settings.HMAC_ACCEPT_LEGACY_SIGNATURES
+    keeps accepting the old "{X-Timestamp}:{full path}" signature on requests
+    without one; those replays are keyed on (timestamp, signature).
+
+    Replays are caught per process by an LRU, and across workers only when
+    CACHES points at a shared backend: the default LocMem cache is private to
+    each process.
+    """
+    # Checked with plain string operations; no URL resolution per request.
+    exempt_prefixes = ('/media/', '/admin/')
+    exempt_paths = frozenset({'/api/token/refresh/'})
+    max_age = 60  # seconds a signed request stays valid
+    nonce_min_length = 16
+    nonce_max_length = 128
+    replay_cache_size = 10000
+    replay_cache_prefix = 'hmac_nonce_'
+    legacy_replay_cache_prefix = 'hmac_seen_'
+
     def __init__(self, get_response):
         self.get_response = get_response
         self.secret_key = settings.HMAC_SECRET_KEY.encode()
+        self.accept_legacy = getattr(settings, 'HMAC_ACCEPT_LEGACY_SIGNATURES', False)
+        # Keyed once; copying skips re-hashing the key for every request.
+        self._base_mac = hmac.new(self.secret_key, digestmod=hashlib.sha256)
+        self._seen = OrderedDict()
+        self._seen_lock = threading.Lock()
 
     def __call__(self, request):
         return self.get_response(request)
 
+    def is_exempt(self, path):
+        return path.startswith(self.exempt_prefixes) or path in self.exempt_paths
+
+    def is_replay(self, token):
+        """
+        Remember each replay token (the nonce, or "{timestamp}_{signature}" for
+        legacy requests) for the validity window. A bounded in-process LRU
+        answers repeats without I/O; cache.add catches replays sent to other
+        workers when the cache is shared.
+        """
+        with self._seen_lock:
+            if token in self._seen:
+                return True
+            self._seen[token] = None
+            if len(self._seen) > self.replay_cache_size:
+                self._seen.popitem(last=False)
+        return not cache.add(token, True, timeout=self.max_age * 2)
+
+    def signing_message(self, request, timestamp, nonce):
+        body_hash = hashlib.sha256(request.body).hexdigest()
+        return f"{timestamp}:{nonce}:{request.method}:{request.get_full_path()}:{body_hash}".encode()
+
+    def legacy_signing_message(self, request, timestamp):
+        return f"{timestamp}:{request.get_full_path()}".encode()
+
     def process_view(self, request, view_func, view_args, view_kwargs):
-        try:
-            # Skip middleware for media and admin paths
-            if (
-                request.path.startswith('/media/') or
-                resolve(request.path).app_name == 'admin' or
-                request.path == '/api/token/refresh/'
-            ):
-                return None
-        except Exception:
-            pass  # In case resolve fails, just continue to validation
+        # Skip middleware for media, admin and token refresh paths
+        if self.is_exempt(request.path):
+            return None
 
         signature = request.headers.get('X-Signature')
         timestamp = request.headers.get('X-Timestamp')
+        nonce = request.headers.get('X-Nonce')
+        legacy = not nonce and self.accept_legacy
+
+        if not signature or not timestamp or not (nonce or legacy):
+            return JsonResponse({"detail": "Missing signature, timestamp or nonce"}, status=403)
 
-        if not signature or not timestamp:
-            return JsonResponse({"detail": "Missing signature or timestamp"}, status=403)
+        if not legacy and not self.nonce_min_length <= len(nonce) <= self.nonce_max_length:
+            return JsonResponse({"detail": "Invalid nonce"}, status=403)
 
         # Reject old timestamps (prevent replay)
-        if abs(int(time.time()) - int(timestamp)) > 60:
+        try:
+            expired = abs(int(time.time()) - int(timestamp)) > self.max_age
+        except ValueError:
+            return JsonResponse({"detail": "Invalid timestamp"}, status=403)
+        if expired:
             return JsonResponse({"detail": "Request expired"}, status=403)
 
-        message = f"{timestamp}:{request.get_full_path()}"
-        
-        expected_signature = hmac.new(
-            self.secret_key,
-            message.encode(),
-            hashlib.sha256
-        ).hexdigest()
+        mac = self._base_mac.copy()
+        if legacy:
+            mac.update(self.legacy_signing_message(request, timestamp))
+            replay_token = f"{self.legacy_replay_cache_prefix}{timestamp}_{signature}"
+        else:
+            mac.update(self.signing_message(request, timestamp, nonce))
+            replay_token = f"{self.replay_cache_prefix}{nonce}"
+        expected_signature = mac.hexdigest()
 
         if not hmac.compare_digest(expected_signature, signature):
             return JsonResponse({"detail": "Invalid signature"}, status=403)
 
-        return None
\ No newline at end of file
+        if self.is_replay(replay_token):
+            return JsonResponse({"detail": "Request already used"}, status=403)
+
+        return None
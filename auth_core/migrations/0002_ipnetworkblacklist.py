@@ -0,0 +1,24 @@
+# Generated by Django 5.0.12 on 2026-10-19 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IPNetworkBlacklist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('network', models.CharField(help_text='CIDR range, e.g. 203.0.113.0/24 or 2001:db8::/64', max_length=49, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.12 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_core', '0002_ipnetworkblacklist'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ipblacklist',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='ipnetworkblacklist',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
+from django.core.exceptions import ValidationError
 from datetime import timedelta
+import ipaddress
 import secrets
 
 class Application(models.Model):
@@ -26,8 +28,11 @@ class APIKey(models.Model):
         super().save(*args, **kwargs)
                      
     def regenerate_key(self):
+        from .api_keys import invalidate_api_key
+        old_key = self.key
         self.key = secrets.token_urlsafe(32)
         self.save()
+        invalidate_api_key(old_key)
 
     def __str__(self):
         return f"{self.application.name} ({self.key})"
@@ -37,4 +42,24 @@ class IPBlacklist(models.Model):
     blacklist_count = models.PositiveIntegerField(default=1)
     permanently_blacklisted = models.BooleanField(default=False)
     created_on = models.DateTimeField(auto_now_add=True)
-    updated_on = models.DateTimeField(auto_now=True)
\ No newline at end of file
+    updated_on = models.DateTimeField(auto_now=True, db_index=True)
+
+class IPNetworkBlacklist(models.Model):
+    network = models.CharField(max_length=49, unique=True, help_text="CIDR range, e.g. 203.0.113.0/24 or 2001:db8::/64")
+    is_active = models.BooleanField(default=True)
+    reason = models.CharField(max_length=255, blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True, db_index=True)
+
+    def clean(self):
+        try:
+            self.network = str(ipaddress.ip_network(self.network, strict=False))
+        except ValueError:
+            raise ValidationError({"network": "Enter a valid IPv4 or IPv6 CIDR range."})
+
+    def save(self, *args, **kwargs):
+        self.network = str(ipaddress.ip_network(self.network, strict=False))
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.network
@@ -0,0 +1,60 @@
+import math
+import time
+from django.core.cache import cache
+
+def now_ms():
+    return int(time.time() * 1000)
+
+def emission_interval_ms(limit, period):
+    """Milliseconds one request "costs" when `limit` requests are allowed per `period`."""
+    return max(1, int(period.total_seconds() * 1000) // max(1, limit))
+
+def gcra_timeout(period):
+    # A live key's TAT is at most one period ahead of its last refresh point
+    # (see gcra_hit), so two periods always outlast it.
+    return 2 * math.ceil(period.total_seconds()) + 1
+
+def gcra_hit(cache_key, limit, period):
+    """
+    Generic cell rate algorithm backed by a single integer per key (the
+    theoretical arrival time in ms). Requests advance it with an atomic incr,
+    so concurrent hits never overwrite each other, and the cost is the same
+    whatever the configured limit. An allowed request is one cache call: the
+    expiry written by add/set is only pushed back when the TAT crosses a
+    period boundary, about once per `limit` hits. Returns
+    (allowed, retry_after_seconds).
+    """
+    now = now_ms()
+    interval = emission_interval_ms(limit, period)
+    period_ms = int(period.total_seconds() * 1000)
+    timeout = gcra_timeout(period)
+
+    try:
+        tat = cache.incr(cache_key, interval)
+    except ValueError:
+        if cache.add(cache_key, now + interval, timeout=timeout):
+            return True, None
+        tat = cache.incr(cache_key, interval)
+
+    if tat - interval < now:
+        # The bucket had fully drained; restart the schedule from now. Racing
+        # writers here can only under-count, and only while far below the limit.
+        cache.set(cache_key, now + interval, timeout=timeout)
+        return True, None
+
+    allow_at = tat - period_ms
+    if allow_at > now:
+        cache.decr(cache_key, interval)
+        return False, (allow_at - now) / 1000
+
+    if tat // period_ms != (tat - interval) // period_ms:
+        cache.touch(cache_key, timeout=timeout)
+    return True, None
+
+def gcra_undo(cache_key, limit, period):
+    """Give back one hit recorded by gcra_hit, e.g. when a sibling limit denied the request."""
+    try:
+        cache.decr(cache_key, emission_interval_ms(limit, period))
+    except ValueError:
+        pass
+
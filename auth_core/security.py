@@ -1,6 +1,5 @@
 from datetime import timedelta
 from django.core.cache import cache
-from django.utils import timezone
 
 class IPBlacklistMixin:
     blacklist_cache_prefix = 'blacklisted_ip_'
@@ -12,8 +11,13 @@ class IPBlacklistMixin:
 
     def record_violation(self, ip):
         key = f"violation_count_{ip}"
-        count = cache.get(key, 0) + 1
-        cache.set(key, count, timeout=3600)  # track violations for 1 hour
+        # track violations for 1 hour; add() only seeds the counter, incr() is atomic
+        cache.add(key, 0, timeout=3600)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=3600)
+            count = 1
 
         if count >= self.blacklist_threshold:
             print(f"Temporarily blacklisting IP: {ip}")
@@ -21,9 +25,5 @@ class IPBlacklistMixin:
             self.record_violation_in_model(ip)
 
     def record_violation_in_model(self, ip):
-        print(f"Recording violation in model for IP: {ip}")
-        from .models import IPBlacklist
-        record, created = IPBlacklist.objects.get_or_create(ip_address=ip)
-        record.blacklist_count += 1
-        record.updated_on = timezone.now()
-        record.save()
+        from .blacklist import violation_buffer
+        violation_buffer.add(ip)
@@ -2,6 +2,8 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from rest_framework.validators import UniqueValidator
 from user_profile.models import BillingAddress
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .tokens import CachedBlacklistRefreshToken
 
 class RegisterSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(
@@ -18,4 +20,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         fields = ['username', 'email', 'password', 'first_name', 'last_name']
 
     def create(self, validated_data):
-        return User.objects.create_user(**validated_data)
\ No newline at end of file
+        return User.objects.create_user(**validated_data)
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedBlacklistRefreshToken
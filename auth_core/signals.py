@@ -1,6 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import IPBlacklist
+from .models import APIKey, IPBlacklist, IPNetworkBlacklist
+from .api_keys import invalidate_api_key
+from .blacklist import PERMANENT_BLACKLIST_THRESHOLD, bump_blacklist_version
+from .authentication import set_user_disabled
+from .tokens import mark_token_blacklisted
 from django.contrib.sessions.models import Session
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
@@ -9,8 +13,49 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+BLACKLIST_ADDRESS_FIELDS = {IPBlacklist: "ip_address", IPNetworkBlacklist: "network"}
+
+@receiver(pre_save, sender=IPBlacklist)
+@receiver(pre_save, sender=IPNetworkBlacklist)
+def note_blacklist_address_change(sender, instance, raw=False, **kwargs):
+    # An incremental sync only sees the new address, so an edited one needs a full reload.
+    field = BLACKLIST_ADDRESS_FIELDS[sender]
+    previous = None
+    if instance.pk and not raw:
+        previous = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    instance._blacklist_address_changed = previous is not None and previous != getattr(instance, field)
+
 @receiver(post_save, sender=IPBlacklist)
 def check_blacklist_count(sender, instance, **kwargs):
-    if instance.blacklist_count >= 15 and not instance.permanently_blacklisted:
+    if instance.blacklist_count >= PERMANENT_BLACKLIST_THRESHOLD and not instance.permanently_blacklisted:
         instance.permanently_blacklisted = True
         instance.save()
+        return
+    bump_blacklist_version(full=getattr(instance, "_blacklist_address_changed", False))
+
+@receiver(post_delete, sender=IPBlacklist)
+@receiver(post_delete, sender=IPNetworkBlacklist)
+def refresh_blacklist_on_delete(sender, instance, **kwargs):
+    bump_blacklist_version(full=True)
+
+@receiver(post_save, sender=IPNetworkBlacklist)
+def refresh_blacklist_on_network_change(sender, instance, **kwargs):
+    bump_blacklist_version(full=getattr(instance, "_blacklist_address_changed", False))
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+def clear_api_key_cache(sender, instance, **kwargs):
+    invalidate_api_key(instance.key)
+
+@receiver(post_save, sender=User)
+def refresh_disabled_user_cache(sender, instance, **kwargs):
+    set_user_disabled(instance.id, not instance.is_active)
+
+@receiver(post_delete, sender=User)
+def mark_deleted_user_disabled(sender, instance, **kwargs):
+    set_user_disabled(instance.id, True)
+
+@receiver(post_save, sender=BlacklistedToken)
+def cache_blacklisted_token(sender, instance, created, **kwargs):
+    if created:
+        mark_token_blacklisted(instance.token.jti, instance.token.expires_at)
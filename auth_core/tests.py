@@ -2,7 +2,32 @@ from django.test import TestCase, RequestFactory
 from django.utils import timezone
 from datetime import timedelta
 from auth_core.models import APIKey, Application
-from auth_core.throttling import APIKeyRateThrottle
+from auth_core.throttling import APIKeyRateThrottle, ExportRequestRateThrottle, GCRARateThrottle, PrivateUserRateThrottle, UserRateThrottle, PermanentBlacklistThrottle
+from auth_core.models import IPBlacklist, IPNetworkBlacklist
+from auth_core.blacklist import PermanentBlacklist, PrefixTrie, permanent_blacklist, violation_buffer
+from auth_core.security import IPBlacklistMixin
+from auth_core.middleware import HMACAuthMiddleware
+from django.test import override_settings
+import hashlib
+import hmac
+import time
+import uuid
+import json
+from rest_framework.exceptions import Throttled
+from auth_core.authentication import APIKeyAuthentication, LazyJWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+from auth_core.api_keys import get_api_key, resolve_api_key
+from auth_core.rate_limit import gcra_hit
+from unittest import mock
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from user_profile.models import UserHandle
+from auth_core.tokens import BLACKLISTED_CACHE_KEY, NOT_BLACKLISTED_CACHE_TIMEOUT, CachedBlacklistRefreshToken
+from django.core.management import call_command
+from io import StringIO
 
 class APIKeyRateThrottleTest(TestCase):
 
@@ -63,3 +88,459 @@ class APIKeyRateThrottleTest(TestCase):
 
         allowed = self.throttle.allow_request(request, None)
         self.assertTrue(allowed)
+
+class APIKeyResolverTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.app = Application.objects.create(name='Resolver App')
+        self.api_key = APIKey.objects.create(application=self.app)
+
+    def make_request(self, key):
+        return self.factory.get('/some-url', HTTP_X_API_KEY=key)
+
+    def test_resolves_once_per_request(self):
+        request = self.make_request(self.api_key.key)
+        with self.assertNumQueries(1):
+            APIKeyAuthentication().authenticate(request)
+            throttle = APIKeyRateThrottle()
+            throttle.allow_request(request, None)
+            throttle.get_cache_key(request)
+
+    def test_cached_across_requests(self):
+        get_api_key(self.api_key.key)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_api_key(self.make_request(self.api_key.key)).id, self.api_key.id)
+
+    def test_regenerate_and_deactivate_invalidate(self):
+        old_key = self.api_key.key
+        get_api_key(old_key)
+        self.api_key.regenerate_key()
+        self.assertIsNone(get_api_key(old_key))
+        self.assertIsNotNone(get_api_key(self.api_key.key))
+
+        self.api_key.is_active = False
+        self.api_key.save()
+        with self.assertRaises(AuthenticationFailed):
+            APIKeyAuthentication().authenticate(self.make_request(self.api_key.key))
+
+class GCRARateLimitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.period = timedelta(seconds=10)
+
+    def hit_at(self, now_ms):
+        with mock.patch('auth_core.rate_limit.now_ms', return_value=now_ms):
+            return gcra_hit('gcra_test', 3, self.period)
+
+    def test_burst_up_to_limit_then_exact_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.hit_at(1_000_000), (True, None))
+        allowed, retry_after = self.hit_at(1_000_000)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 3.332, places=3)
+        # a denied request does not consume capacity
+        self.assertEqual(self.hit_at(1_000_000 + 3_332), (True, None))
+
+    def test_capacity_recovers_after_idle(self):
+        for _ in range(3):
+            self.hit_at(1_000_000)
+        for _ in range(3):
+            self.assertTrue(self.hit_at(1_000_000 + 20_000)[0])
+
+    def test_state_is_a_single_integer(self):
+        self.hit_at(1_000_000)
+        self.assertIsInstance(cache.get('gcra_test'), int)
+
+    def test_expiry_pushed_back_once_per_period(self):
+        self.hit_at(1_000_000)
+        with mock.patch.object(cache, 'touch', wraps=cache.touch) as touch:
+            self.hit_at(1_000_000)
+            self.hit_at(1_000_000)
+            self.assertFalse(touch.called)
+            # the schedule now crosses into the next 10 s period
+            self.assertTrue(self.hit_at(1_003_334)[0])
+            self.assertEqual(touch.call_count, 1)
+
+    def test_base_throttle_keys_on_user_or_ip(self):
+        request = RequestFactory().get('/some-url', REMOTE_ADDR='203.0.113.9')
+        request.user = AnonymousUser()
+        self.assertEqual(GCRARateThrottle().get_cache_key(request), 'throttle_gcra_ip_203.0.113.9')
+        request.user = User.objects.create(username='gcra')
+        self.assertEqual(GCRARateThrottle().get_cache_key(request), f'throttle_gcra_user_{request.user.pk}')
+
+class CompositeRateThrottleTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.app = Application.objects.create(name='Composite App')
+        self.api_key = APIKey.objects.create(application=self.app, rate_limit=100)
+        self.user = User.objects.create(username='composite')
+
+    def make_request(self):
+        request = self.factory.get('/some-url', HTTP_X_API_KEY=self.api_key.key)
+        request.user = self.user
+        return request
+
+    def count_cache_calls(self):
+        counters = {}
+        for name in ('get_many', 'add', 'set', 'incr', 'decr', 'touch'):
+            patcher = mock.patch.object(cache, name, wraps=getattr(cache, name))
+            counters[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+        return counters
+
+    def test_allowed_request_costs_one_call_per_key(self):
+        # A whole number of minutes, so neither schedule crosses a period boundary.
+        with mock.patch('auth_core.rate_limit.now_ms', return_value=60_000 * 10**7):
+            self.assertTrue(PrivateUserRateThrottle().allow_request(self.make_request(), None))
+            counters = self.count_cache_calls()
+            self.assertTrue(PrivateUserRateThrottle().allow_request(self.make_request(), None))
+        self.assertEqual({name: c.call_count for name, c in counters.items() if c.call_count}, {'incr': 2})
+
+    def test_denial_gives_back_committed_keys(self):
+        for _ in range(UserRateThrottle.rate_limit):
+            PrivateUserRateThrottle().allow_request(self.make_request(), None)
+        api_key_tat = cache.get(f'throttle_gcra_{self.api_key.key}')
+        self.assertFalse(PrivateUserRateThrottle().allow_request(self.make_request(), None))
+        self.assertEqual(cache.get(f'throttle_gcra_{self.api_key.key}'), api_key_tat)
+
+    def test_most_restrictive_limit_wins(self):
+        for _ in range(UserRateThrottle.rate_limit):
+            self.assertTrue(PrivateUserRateThrottle().allow_request(self.make_request(), None))
+
+        throttle = PrivateUserRateThrottle()
+        self.assertFalse(throttle.allow_request(self.make_request(), None))
+        self.assertGreater(throttle.wait(), 0)
+
+    def test_exports_use_their_own_api_key_bucket(self):
+        self.assertTrue(ExportRequestRateThrottle().allow_request(self.make_request(), None))
+        self.assertIsNone(cache.get(f'throttle_gcra_{self.api_key.key}'))
+        self.assertIsNotNone(cache.get(f'throttle_gcra_export_{self.api_key.key}'))
+
+    def test_missing_api_key_is_denied(self):
+        request = self.factory.get('/some-url')
+        request.user = self.user
+        self.assertFalse(PrivateUserRateThrottle().allow_request(request, None))
+
+class PermanentBlacklistThrottleTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        permanent_blacklist.expire()
+        self.throttle = PermanentBlacklistThrottle()
+
+    def make_request(self, ip):
+        return self.factory.get('/some-url', REMOTE_ADDR=ip)
+
+    def test_allowed_ip_costs_no_queries_once_loaded(self):
+        self.assertTrue(self.throttle.allow_request(self.make_request('10.0.0.1'), None))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.throttle.allow_request(self.make_request('10.0.0.2'), None))
+
+    def test_blacklist_change_is_picked_up(self):
+        self.assertTrue(self.throttle.allow_request(self.make_request('10.0.0.3'), None))
+        IPBlacklist.objects.create(ip_address='10.0.0.3', blacklist_count=15)
+        with self.assertRaises(Throttled):
+            self.throttle.allow_request(self.make_request('10.0.0.3'), None)
+
+    def test_ban_from_another_process_is_polled(self):
+        self.assertTrue(self.throttle.allow_request(self.make_request('10.0.0.4'), None))
+        # bulk_create sends no signal and touches no cache token, like a write
+        # made by another worker behind a per-process cache.
+        IPBlacklist.objects.bulk_create([IPBlacklist(ip_address='10.0.0.4', permanently_blacklisted=True)])
+        self.assertTrue(self.throttle.allow_request(self.make_request('10.0.0.4'), None))
+        later = time.monotonic() + PermanentBlacklist.refresh_interval
+        with mock.patch('auth_core.blacklist.time.monotonic', return_value=later):
+            with self.assertRaises(Throttled):
+                self.throttle.allow_request(self.make_request('10.0.0.4'), None)
+
+    def test_network_ranges_are_blacklisted(self):
+        network = IPNetworkBlacklist.objects.create(network='203.0.113.77/24')
+        self.assertEqual(network.network, '203.0.113.0/24')
+        with self.assertRaises(Throttled):
+            self.throttle.allow_request(self.make_request('203.0.113.200'), None)
+        self.assertTrue(self.throttle.allow_request(self.make_request('203.0.114.1'), None))
+
+        network.is_active = False
+        network.save()
+        self.assertTrue(self.throttle.allow_request(self.make_request('203.0.113.200'), None))
+
+    def test_edited_address_is_unblocked(self):
+        network = IPNetworkBlacklist.objects.create(network='203.0.113.0/24')
+        ip = IPBlacklist.objects.create(ip_address='10.0.0.5', permanently_blacklisted=True)
+        self.assertIn('203.0.113.5', permanent_blacklist)
+        self.assertIn('10.0.0.5', permanent_blacklist)
+
+        network.network = '198.51.100.0/24'
+        network.save()
+        ip.ip_address = '10.0.0.6'
+        ip.save()
+        self.assertNotIn('203.0.113.5', permanent_blacklist)
+        self.assertIn('198.51.100.5', permanent_blacklist)
+        self.assertNotIn('10.0.0.5', permanent_blacklist)
+        self.assertIn('10.0.0.6', permanent_blacklist)
+
+class PrefixTrieTest(TestCase):
+
+    def test_ipv4_and_ipv6_prefixes(self):
+        trie = PrefixTrie()
+        trie.add('10.1.0.0/16')
+        trie.add('2001:db8:abcd:12::/64')
+        self.assertIn('10.1.255.3', trie)
+        self.assertNotIn('10.2.0.1', trie)
+        self.assertIn('2001:db8:abcd:12:ffff::1', trie)
+        self.assertNotIn('2001:db8:abcd:13::1', trie)
+        self.assertNotIn('not-an-ip', trie)
+
+    def test_remove(self):
+        trie = PrefixTrie()
+        trie.add('192.0.2.0/24')
+        trie.add('192.0.2.8/32')
+        trie.remove('192.0.2.0/24')
+        self.assertEqual(len(trie), 1)
+        self.assertIn('192.0.2.8', trie)
+        self.assertNotIn('192.0.2.9', trie)
+
+class ViolationRecordingTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        permanent_blacklist.expire()
+        start = mock.patch.object(violation_buffer, 'start')
+        start.start()
+        self.addCleanup(start.stop)
+
+    def test_violations_are_counted_and_flushed_in_batch(self):
+        mixin = IPBlacklistMixin()
+        for _ in range(4):
+            mixin.record_violation('198.51.100.7')
+        self.assertEqual(cache.get('violation_count_198.51.100.7'), 4)
+        self.assertTrue(mixin.is_ip_blacklisted('198.51.100.7'))
+        self.assertFalse(IPBlacklist.objects.exists())
+
+        # savepoint, bulk insert, one increment per IP, release
+        with self.assertNumQueries(4):
+            self.assertEqual(violation_buffer.flush(), 1)
+        self.assertEqual(IPBlacklist.objects.get(ip_address='198.51.100.7').blacklist_count, 2)
+
+    def test_flush_escalates_to_permanent(self):
+        IPBlacklist.objects.create(ip_address='198.51.100.8', blacklist_count=14)
+        violation_buffer.add('198.51.100.8')
+        violation_buffer.flush()
+        self.assertTrue(IPBlacklist.objects.get(ip_address='198.51.100.8').permanently_blacklisted)
+        self.assertIn('198.51.100.8', permanent_blacklist)
+
+@override_settings(HMAC_SECRET_KEY='test-secret')
+class HMACAuthMiddlewareTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = HMACAuthMiddleware(lambda request: None)
+
+    def sign(self, method, path, timestamp, nonce, body=b''):
+        message = f"{timestamp}:{nonce}:{method}:{path}:{hashlib.sha256(body).hexdigest()}"
+        return hmac.new(b'test-secret', message.encode(), hashlib.sha256).hexdigest()
+
+    def signed_request(self, path, timestamp=None, nonce=None):
+        timestamp = str(timestamp or int(time.time()))
+        nonce = nonce or uuid.uuid4().hex
+        return self.factory.get(
+            path,
+            HTTP_X_SIGNATURE=self.sign('GET', path, timestamp, nonce),
+            HTTP_X_TIMESTAMP=timestamp,
+            HTTP_X_NONCE=nonce,
+        )
+
+    def signed_post(self, path, data, timestamp, nonce):
+        body = json.dumps(data).encode()
+        return self.factory.post(
+            path, body, content_type='application/json',
+            HTTP_X_SIGNATURE=self.sign('POST', path, timestamp, nonce, body),
+            HTTP_X_TIMESTAMP=str(timestamp),
+            HTTP_X_NONCE=nonce,
+        )
+
+    def process(self, request):
+        return self.middleware.process_view(request, None, (), {})
+
+    def test_valid_signature_then_replay_rejected(self):
+        timestamp = int(time.time())
+        nonce = uuid.uuid4().hex
+        self.assertIsNone(self.process(self.signed_request('/api/quiz/list_categories/', timestamp, nonce)))
+        response = self.process(self.signed_request('/api/quiz/list_categories/', timestamp, nonce))
+        self.assertEqual(response.status_code, 403)
+
+    def test_same_path_same_second_both_allowed(self):
+        timestamp = int(time.time())
+        path = '/api/quiz/submit_quiz_answer/'
+        first = self.signed_post(path, {'session_id': 1, 'answer': 'A'}, timestamp, uuid.uuid4().hex)
+        second = self.signed_post(path, {'session_id': 2, 'answer': 'B'}, timestamp, uuid.uuid4().hex)
+        self.assertIsNone(self.process(first))
+        self.assertIsNone(self.process(second))
+        self.assertIsNone(self.process(self.signed_request('/api/quiz/list_categories/', timestamp)))
+        self.assertIsNone(self.process(self.signed_request('/api/quiz/list_categories/', timestamp)))
+
+    def test_tampered_body_or_method_rejected(self):
+        timestamp = int(time.time())
+        nonce = uuid.uuid4().hex
+        request = self.signed_post('/api/quiz/submit_quiz_answer/', {'answer': 'A'}, timestamp, nonce)
+        request._body = b'{"answer": "B"}'
+        self.assertEqual(self.process(request).status_code, 403)
+
+    def test_replay_seen_by_another_worker_through_shared_cache(self):
+        # Both middleware instances share this process's cache, as workers do
+        # when CACHES is a shared backend.
+        request = self.signed_request('/api/quiz/list_categories/')
+        self.assertIsNone(self.process(request))
+        other_worker = HMACAuthMiddleware(lambda request: None)
+        self.assertEqual(other_worker.process_view(request, None, (), {}).status_code, 403)
+
+    def legacy_request(self, path, timestamp):
+        signature = hmac.new(b'test-secret', f"{timestamp}:{path}".encode(), hashlib.sha256).hexdigest()
+        return self.factory.get(path, HTTP_X_SIGNATURE=signature, HTTP_X_TIMESTAMP=str(timestamp))
+
+    @override_settings(HMAC_ACCEPT_LEGACY_SIGNATURES=True)
+    def test_legacy_signature_accepted_during_rollout(self):
+        middleware = HMACAuthMiddleware(lambda request: None)
+        timestamp = int(time.time())
+        request = self.legacy_request('/api/quiz/list_categories/', timestamp)
+        self.assertIsNone(middleware.process_view(request, None, (), {}))
+        replay = self.legacy_request('/api/quiz/list_categories/', timestamp)
+        self.assertEqual(middleware.process_view(replay, None, (), {}).status_code, 403)
+        self.assertIsNone(middleware.process_view(self.signed_request('/api/quiz/list_categories/'), None, (), {}))
+
+    @override_settings(HMAC_ACCEPT_LEGACY_SIGNATURES=False)
+    def test_legacy_signature_rejected_once_disabled(self):
+        middleware = HMACAuthMiddleware(lambda request: None)
+        request = self.legacy_request('/api/quiz/list_categories/', int(time.time()))
+        self.assertEqual(middleware.process_view(request, None, (), {}).status_code, 403)
+
+    def test_exempt_paths_and_bad_timestamp(self):
+        self.assertIsNone(self.process(self.factory.get('/admin/login/')))
+        self.assertIsNone(self.process(self.factory.get('/api/token/refresh/')))
+        request = self.factory.get('/api/quiz/list_categories/', HTTP_X_SIGNATURE='abc', HTTP_X_TIMESTAMP='soon')
+        self.assertEqual(self.process(request).status_code, 403)
+
+class PathScopedMiddlewareTest(TestCase):
+
+    def test_admin_keeps_browser_stack(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        client = self.client_class(enforce_csrf_checks=True)
+        response = client.get('/admin/login/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('csrftoken', response.cookies)
+        self.assertEqual(response.headers['X-Frame-Options'], 'DENY')
+
+        response = client.post('/admin/login/', {'username': 'admin', 'password': 'pass'})
+        self.assertEqual(response.status_code, 403)  # CSRF still enforced
+        response = client.post('/admin/login/', {
+            'username': 'admin',
+            'password': 'pass',
+            'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(client.get('/admin/').status_code, 200)
+
+    def test_api_skips_browser_stack(self):
+        response = self.client.get('/api/quiz/list_categories/')
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+        self.assertNotIn('X-Frame-Options', response.headers)
+
+class LazyJWTAuthenticationTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user('lazy', 'lazy@example.com', 'pass')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def authenticate(self):
+        request = self.factory.get('/api/quiz/list_categories/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return LazyJWTAuthentication().authenticate(request)[0]
+
+    def test_no_query_until_fields_are_used(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual(user.id, self.user.id)
+            self.assertTrue(user.is_authenticated)
+            self.assertEqual(user, self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, 'lazy')
+            self.assertEqual(user.email, 'lazy@example.com')
+
+    def test_save_runs_user_signals(self):
+        user = self.authenticate()
+        user.username = 'renamed'
+        user.save()
+        self.assertEqual(type(user), User)
+        self.assertTrue(UserHandle.objects.filter(user=self.user, kind=UserHandle.USERNAME, value='renamed').exists())
+        self.assertEqual(User.objects.get(pk=self.user.pk).email, 'lazy@example.com')
+
+    def test_deactivated_user_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+class TokenBlacklistTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('tokens', 'tokens@example.com', 'pass')
+
+    def test_blacklisted_token_rejected_from_cache(self):
+        token = CachedBlacklistRefreshToken.for_user(self.user)
+        token.blacklist()
+        with self.assertNumQueries(0):
+            with self.assertRaises(TokenError):
+                CachedBlacklistRefreshToken(str(token))
+
+    def test_live_token_checked_against_database_once(self):
+        token = str(CachedBlacklistRefreshToken.for_user(self.user))
+        with self.assertNumQueries(1):
+            CachedBlacklistRefreshToken(token)
+        with self.assertNumQueries(0):
+            CachedBlacklistRefreshToken(token)
+
+    def test_clear_result_expires_quickly(self):
+        token = CachedBlacklistRefreshToken.for_user(self.user)
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            CachedBlacklistRefreshToken(str(token))
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], NOT_BLACKLISTED_CACHE_TIMEOUT)
+        # A blacklisting this process never saw is picked up once the entry lapses.
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+        cache.delete(BLACKLISTED_CACHE_KEY.format(jti=token['jti']))
+        with self.assertRaises(TokenError):
+            CachedBlacklistRefreshToken(str(token))
+
+    def test_blacklisting_overwrites_cached_clear_result(self):
+        token = CachedBlacklistRefreshToken.for_user(self.user)
+        CachedBlacklistRefreshToken(str(token))
+        token.blacklist()
+        with self.assertRaises(TokenError):
+            CachedBlacklistRefreshToken(str(token))
+
+    def test_refresh_rotation_blacklists_old_token(self):
+        token = str(CachedBlacklistRefreshToken.for_user(self.user))
+        response = self.client.post('/api/token/refresh/', {'refresh': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('refresh', response.json())
+        response = self.client.post('/api/token/refresh/', {'refresh': token})
+        self.assertEqual(response.status_code, 403)
+
+    def test_purge_removes_only_expired_tokens(self):
+        live = CachedBlacklistRefreshToken.for_user(self.user)
+        for _ in range(3):
+            CachedBlacklistRefreshToken.for_user(self.user).blacklist()
+        OutstandingToken.objects.exclude(jti=live['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+
+        call_command('purge_expired_tokens', batch_size=2, sleep=0, stdout=StringIO())
+
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
@@ -1,176 +1,178 @@
 from rest_framework.throttling import BaseThrottle
 from rest_framework.exceptions import Throttled
-from django.utils import timezone
 from datetime import timedelta
-from .models import APIKey, IPBlacklist
-from django.core.cache import cache
+from .blacklist import permanent_blacklist
+from .api_keys import resolve_api_key
+from .rate_limit import gcra_hit, gcra_undo
 from .security import IPBlacklistMixin
 
 class PermanentBlacklistThrottle(BaseThrottle):
     def allow_request(self, request, view):
         ip = self.get_ident(request)
-        if IPBlacklist.objects.filter(ip_address=ip, permanently_blacklisted=True).exists():
+        if ip in permanent_blacklist:
             raise Throttled(detail="Your IP has been permanently blacklisted due to repeated violations.")
         return True
-    
-class APIKeyRateThrottle(BaseThrottle):
-    cache_format = 'throttle_{key}'
+
+class GCRARateThrottle(BaseThrottle):
+    """
+    Base for the rate throttles. Each key stores a single number (see
+    rate_limit.gcra_hit), so a request costs the same whatever the limit.
+    By default requests are keyed on the user id, or the client IP for
+    anonymous requests; subclasses override get_cache_key to key on
+    anything else.
+    """
+    cache_format = 'throttle_gcra_{ident}'
+    rate_limit = None
+    rate_period = None
+    allow_without_key = True  # outcome when get_cache_key() has nothing to throttle on
 
     def __init__(self):
-        self._retry_after = None 
+        self._retry_after = None
 
     def get_cache_key(self, request):
-        api_key = self.get_api_key(request)
-        if not api_key or not api_key.is_active:
-            return None
-        return self.cache_format.format(key=api_key.key)
+        if request.user and request.user.is_authenticated:
+            ident = f"user_{request.user.pk}"
+        else:
+            ident = f"ip_{self.get_ident(request)}"
+        return self.cache_format.format(ident=ident)
 
-    def get_api_key(self, request):
-        key = request.headers.get('X-API-KEY')
-        if not key:
-            return None
-        try:
-            return APIKey.objects.get(key=key)
-        except APIKey.DoesNotExist:
-            return None
+    def get_rate(self, request):
+        return self.rate_limit, self.rate_period
 
     def allow_request(self, request, view):
-        api_key = self.get_api_key(request)
-        if not api_key:
-            return False
-
         cache_key = self.get_cache_key(request)
         if not cache_key:
-            return False
+            return self.allow_without_key
+
+        rate_limit, rate_period = self.get_rate(request)
+        allowed, self._retry_after = gcra_hit(cache_key, rate_limit, rate_period)
+        if allowed:
+            return True
+        return self.throttle_failure(request)
 
-        history = cache.get(cache_key, [])
+    def throttle_failure(self, request):
+        return False
 
-        now = timezone.now()
-        window_start = now - api_key.rate_limit_period
+    def wait(self):
+        return self._retry_after
 
-        history = [timestamp for timestamp in history if timestamp > window_start]
+class APIKeyRateThrottle(GCRARateThrottle):
+    cache_format = 'throttle_gcra_{key}'
+    allow_without_key = False
 
-        if len(history) >= api_key.rate_limit:
-            # Rate limit exceeded
-            self._retry_after = (history[0] + api_key.rate_limit_period - now).total_seconds()
-            return False
+    def get_cache_key(self, request):
+        api_key = self.get_api_key(request)
+        if not api_key or not api_key.is_active:
+            return None
+        return self.cache_format.format(key=api_key.key)
 
-        history.append(now)
-        cache.set(cache_key, history, timeout=int(api_key.rate_limit_period.total_seconds()))
+    def get_api_key(self, request):
+        return resolve_api_key(request)
 
-        self._retry_after = None
-        return True
+    def get_rate(self, request):
+        api_key = self.get_api_key(request)
+        return api_key.rate_limit, api_key.rate_limit_period
 
-    def wait(self):
-        return self._retry_after
+class ExportAPIKeyRateThrottle(APIKeyRateThrottle):
+    """Same per-key limit as APIKeyRateThrottle, counted in a bucket of its own so exports leave the interactive budget alone."""
+    cache_format = 'throttle_gcra_export_{key}'
 
-class UserRateThrottle(BaseThrottle):
-    cache_format = 'throttle_user_{user_id}'
+class UserRateThrottle(GCRARateThrottle):
+    cache_format = 'throttle_gcra_user_{user_id}'
     rate_limit = 20  # max requests allowed
     rate_period = timedelta(minutes=1)  # time window
 
-    def __init__(self):
-        self._retry_after = None
-
     def get_cache_key(self, request):
         if not request.user or not request.user.is_authenticated:
+            # No user or not authenticated, skip throttling here
             return None
         return self.cache_format.format(user_id=request.user.id)
 
-    def allow_request(self, request, view):
-        cache_key = self.get_cache_key(request)
-        if not cache_key:
-            # No user or not authenticated, skip throttling here
-            return True
-
-        history = cache.get(cache_key, [])
-        now = timezone.now()
-        window_start = now - self.rate_period
-        history = [timestamp for timestamp in history if timestamp > window_start]
-
-        if len(history) >= self.rate_limit:
-            self._retry_after = (history[0] + self.rate_period - now).total_seconds()
-            return False
+class ExportRateThrottle(UserRateThrottle):
+    cache_format = 'throttle_gcra_export_{user_id}'
+    rate_limit = 10  # exports are heavy, keep them off the interactive budget
+    rate_period = timedelta(hours=1)
 
-        history.append(now)
-        cache.set(cache_key, history, timeout=int(self.rate_period.total_seconds()))
-        self._retry_after = None
-        return True
-
-    def wait(self):
-        return self._retry_after
-    
-class LoginRateThrottle(BaseThrottle, IPBlacklistMixin):
-    cache_format = 'throttle_login_{ip}'
-    rate_limit = 3  # per IP
-    rate_period = timedelta(minutes=1)
-
-    def __init__(self):
-        self._retry_after = None
+class IPViolationRateThrottle(GCRARateThrottle, IPBlacklistMixin):
+    """Per-IP throttle that records violations and escalates to a temporary block."""
 
     def get_cache_key(self, request):
         ip = self.get_ident(request)
         return self.cache_format.format(ip=ip)
 
-    def allow_request(self, request, view):
+    def throttle_failure(self, request):
         ip = self.get_ident(request)
-        self.ip = ip  
+        self.ip = ip
 
-        cache_key = self.get_cache_key(request)
-        history = cache.get(cache_key, [])
-        now = timezone.now()
-        history = [ts for ts in history if ts > now - self.rate_period]
-
-        if len(history) >= self.rate_limit:
-            # Track violation here
-            self.record_violation(ip)
-            self._retry_after = (history[0] + self.rate_period - now).total_seconds()
-
-            if self.is_ip_blacklisted(ip):
-                raise Throttled(detail="Too many repeated attempts. Your IP has been temporarily blocked.")
-            
-            return False
-
-        history.append(now)
-        cache.set(cache_key, history, timeout=int(self.rate_period.total_seconds()))
-        return True
+        # Track violation here
+        self.record_violation(ip)
+        if self.is_ip_blacklisted(ip):
+            raise Throttled(detail="Too many repeated attempts. Your IP has been temporarily blocked.")
+        return False
 
-    def wait(self):
-        return self._retry_after
+class LoginRateThrottle(IPViolationRateThrottle):
+    cache_format = 'throttle_gcra_login_{ip}'
+    rate_limit = 3  # per IP
+    rate_period = timedelta(minutes=1)
 
-class RegisterRateThrottle(BaseThrottle, IPBlacklistMixin):
-    cache_format = 'throttle_register_{ip}'
-    rate_limit = 5  # allow only 3 registration attempts per minute per IP
+class RegisterRateThrottle(IPViolationRateThrottle):
+    cache_format = 'throttle_gcra_register_{ip}'
+    rate_limit = 5  # registration attempts per minute per IP
     rate_period = timedelta(minutes=1)
 
+class CompositeRateThrottle(BaseThrottle):
+    """
+    Evaluate several GCRA throttles together and report the most restrictive
+    wait(). Each key is committed with the atomic gcra_hit, so concurrent hits
+    are all counted and an allowed request costs one cache call per key. If a
+    later key denies, the keys already committed are given back, so a denied
+    request consumes nothing.
+    """
+    throttle_classes = []
+
     def __init__(self):
         self._retry_after = None
 
-    def get_cache_key(self, request):
-        ip = self.get_ident(request)
-        return self.cache_format.format(ip=ip)
+    def deny(self, request, denied):
+        self._retry_after = max(retry_after for _, retry_after in denied)
+        for throttle, _ in denied:
+            throttle.throttle_failure(request)
+        return False
 
     def allow_request(self, request, view):
-        ip = self.get_ident(request)
-        self.ip = ip  
-        
-        cache_key = self.get_cache_key(request)
-        history = cache.get(cache_key, [])
-        now = timezone.now()
-        history = [ts for ts in history if ts > now - self.rate_period]
-
-        if len(history) >= self.rate_limit:
-            self.record_violation(ip)
-            self._retry_after = (history[0] + self.rate_period - now).total_seconds()
+        keyed = []
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            cache_key = throttle.get_cache_key(request)
+            if cache_key:
+                rate_limit, rate_period = throttle.get_rate(request)
+                keyed.append((throttle, cache_key, rate_limit, rate_period))
+            elif not throttle.allow_without_key:
+                return False
+
+        committed = []
+        for throttle, cache_key, rate_limit, rate_period in keyed:
+            allowed, retry_after = gcra_hit(cache_key, rate_limit, rate_period)
+            if not allowed:
+                for key, limit, period in committed:
+                    gcra_undo(key, limit, period)
+                return self.deny(request, [(throttle, retry_after)])
+            committed.append((cache_key, rate_limit, rate_period))
 
-            if self.is_ip_blacklisted(ip):
-                raise Throttled(detail="Too many repeated attempts. Your IP has been temporarily blocked.")
-            
-            return False
-
-        history.append(now)
-        cache.set(cache_key, history, timeout=int(self.rate_period.total_seconds()))
+        self._retry_after = None
         return True
 
     def wait(self):
         return self._retry_after
+
+class PrivateUserRateThrottle(CompositeRateThrottle):
+    throttle_classes = [APIKeyRateThrottle, UserRateThrottle]
+
+class LoginRequestRateThrottle(CompositeRateThrottle):
+    throttle_classes = [APIKeyRateThrottle, LoginRateThrottle]
+
+class RegisterRequestRateThrottle(CompositeRateThrottle):
+    throttle_classes = [APIKeyRateThrottle, RegisterRateThrottle]
+
+class ExportRequestRateThrottle(CompositeRateThrottle):
+    throttle_classes = [ExportAPIKeyRateThrottle, ExportRateThrottle]
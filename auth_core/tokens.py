@@ -0,0 +1,57 @@
+import time
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+BLACKLISTED_CACHE_KEY = "token_blacklisted:{jti}"
+# A "not blacklisted" answer may be stale in every worker that did not do the
+# blacklisting, so it is only trusted briefly.
+NOT_BLACKLISTED_CACHE_TIMEOUT = 5
+
+def cache_blacklist_status(jti, expires_at, blacklisted):
+    """
+    Remember a blacklisted jti until the token would have expired anyway (past
+    that point the signature check rejects it without any lookup), and a clear
+    one for NOT_BLACKLISTED_CACHE_TIMEOUT seconds at most.
+    """
+    timeout = int(expires_at.timestamp() - time.time())
+    if not blacklisted:
+        timeout = min(timeout, NOT_BLACKLISTED_CACHE_TIMEOUT)
+    if timeout > 0:
+        cache.set(BLACKLISTED_CACHE_KEY.format(jti=jti), blacklisted, timeout=timeout)
+
+def mark_token_blacklisted(jti, expires_at):
+    cache_blacklist_status(jti, expires_at, True)
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """
+    RefreshToken whose blacklist check consults the cache first. Positive
+    answers are kept until the token expires. Negative answers are kept for a
+    few seconds only, enough to absorb a burst of refreshes: the cache may be
+    per process, and a blacklisting done elsewhere (another worker, or a bulk
+    write that skips post_save) is only seen by the database lookup.
+    """
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        blacklisted = cache.get(BLACKLISTED_CACHE_KEY.format(jti=jti))
+        if blacklisted is None:
+            blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+            cache_blacklist_status(jti, datetime_from_epoch(self.payload["exp"]), blacklisted)
+        if blacklisted:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        # Tokens issued by this app are already outstanding, so skip the user
+        # lookup simplejwt does to build a missing OutstandingToken row.
+        jti = self.payload[api_settings.JTI_CLAIM]
+        token = OutstandingToken.objects.filter(jti=jti).only("id", "jti", "expires_at").first()
+        if token is None:
+            result = super().blacklist()
+        else:
+            result = BlacklistedToken.objects.get_or_create(token=token)
+        mark_token_blacklisted(jti, datetime_from_epoch(self.payload["exp"]))
+        return result
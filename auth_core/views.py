@@ -3,13 +3,18 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from django.contrib.auth import authenticate
-from .authentication import APIKeyAuthentication
-from .throttling import APIKeyRateThrottle, UserRateThrottle, LoginRateThrottle, RegisterRateThrottle, PermanentBlacklistThrottle
+from .authentication import APIKeyAuthentication, LazyJWTAuthentication
+from .throttling import (
+    APIKeyRateThrottle,
+    PermanentBlacklistThrottle,
+    PrivateUserRateThrottle,
+    LoginRequestRateThrottle,
+    RegisterRequestRateThrottle,
+)
 from .serializers import RegisterSerializer
+from .tokens import CachedBlacklistRefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 
 class DebugTokenRefreshView(TokenRefreshView):
@@ -34,12 +39,12 @@ class PublicViewMixin:
         return super().dispatch(*args, **kwargs)
     
 class PrivateUserViewMixin:
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [LazyJWTAuthentication]
     permission_classes = [IsAuthenticated]
-    throttle_classes = [PermanentBlacklistThrottle, APIKeyRateThrottle, UserRateThrottle]
+    throttle_classes = [PermanentBlacklistThrottle, PrivateUserRateThrottle]
 
 class LoginAPIView(PublicViewMixin, APIView):
-    throttle_classes = [PermanentBlacklistThrottle, APIKeyRateThrottle, LoginRateThrottle]
+    throttle_classes = [PermanentBlacklistThrottle, LoginRequestRateThrottle]
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
@@ -47,14 +52,14 @@ class LoginAPIView(PublicViewMixin, APIView):
         if not user:
             raise AuthenticationFailed('Invalid credentials')
         
-        refresh = RefreshToken.for_user(user)
+        refresh = CachedBlacklistRefreshToken.for_user(user)
         return Response({
             'refresh': str(refresh),
             'access': str(refresh.access_token),
         })
 
 class RegisterView(PublicViewMixin, APIView):    
-    throttle_classes = [PermanentBlacklistThrottle, APIKeyRateThrottle, RegisterRateThrottle]
+    throttle_classes = [PermanentBlacklistThrottle, RegisterRequestRateThrottle]
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
@@ -67,7 +72,7 @@ class RegisterView(PublicViewMixin, APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 class LogoutView(PrivateUserViewMixin, APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [LazyJWTAuthentication]
     permission_classes = [IsAuthenticated]
     throttle_classes = []
 
@@ -78,7 +83,7 @@ class LogoutView(PrivateUserViewMixin, APIView):
             return Response({"detail": "Refresh token required"}, status=400)
 
         try:
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
             token.blacklist()
             return Response({"detail": "Logout successful"})
         except TokenError:
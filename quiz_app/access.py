@@ -0,0 +1,117 @@
+from collections import defaultdict
+from django.db import connection, transaction
+from user_profile.handles import normalize_handle, username_resolver
+from user_profile.provisioning import create_placeholder_users
+from .constant import ACCESS_TYPE_CHOICES
+from .models import QuizAccess, QuizGroupAccess, strongest_access_type
+from .response_cache import bump_namespace_version
+
+ACCESS_TYPES = {value for value, _ in ACCESS_TYPE_CHOICES}
+MAX_BULK_GRANT = 1000
+
+class QuizPermissions:
+    """
+    One user's access to quizzes, fetched at most once per quiz. prefetch()
+    loads the direct and group grants for a whole page of quizzes in one
+    query; every later check for those quizzes is answered from memory.
+    Ownership is read from participant_id, so the owner FK is never loaded.
+    """
+    def __init__(self, user):
+        self.user = user
+        self._access_types = {}
+
+    def is_owner(self, quiz):
+        return self.user.pk is not None and quiz.participant_id == self.user.pk
+
+    def prefetch(self, quizzes):
+        quiz_ids = {
+            quiz.pk for quiz in quizzes
+            if quiz.pk not in self._access_types and not self.is_owner(quiz)
+        }
+        if not quiz_ids:
+            return
+        found = defaultdict(set)
+        if self.user.pk is not None:
+            rows = (
+                QuizAccess.objects
+                .filter(quiz_id__in=quiz_ids, participant_id=self.user.pk)
+                .values_list("quiz_id", "access_type")
+                .union(
+                    QuizGroupAccess.objects
+                    .filter(quiz_id__in=quiz_ids, group__memberships__user_id=self.user.pk)
+                    .values_list("quiz_id", "access_type")
+                )
+            )
+            for quiz_id, access_type in rows:
+                found[quiz_id].add(access_type)
+        for quiz_id in quiz_ids:
+            self._access_types[quiz_id] = strongest_access_type(found[quiz_id])
+
+    def access_type(self, quiz):
+        if self.is_owner(quiz):
+            return "full_access"
+        if quiz.pk not in self._access_types:
+            self.prefetch([quiz])
+        return self._access_types[quiz.pk]
+
+    def is_accessible(self, quiz):
+        return quiz.status == "public" or self.access_type(quiz) is not None
+
+    def can_edit(self, quiz):
+        return self.access_type(quiz) == "full_access"
+
+    def forget(self, quiz):
+        self._access_types.pop(quiz.pk, None)
+
+def get_quiz_permissions(request):
+    """The QuizPermissions for request.user, built at most once per request."""
+    http_request = getattr(request, "_request", request)
+    if not hasattr(http_request, "_quiz_permissions"):
+        http_request._quiz_permissions = QuizPermissions(request.user)
+    return http_request._quiz_permissions
+
+def grant_access_bulk(quiz, handles, access_type, granted_by):
+    """
+    Grant `access_type` on `quiz` to every username in `handles` with a fixed
+    number of queries: one resolve, one bulk insert for unknown users, one read
+    of existing grants and one upsert. Returns [(username, outcome), ...] in
+    input order, where outcome is "created", "updated", "unchanged" or "owner".
+    """
+    usernames = list(dict.fromkeys(
+        handle for handle in (normalize_handle(h).lstrip("@") for h in handles) if handle
+    ))
+    user_ids = username_resolver.resolve_many(usernames)
+    missing = [username for username in usernames if username not in user_ids]
+    if missing:
+        user_ids.update(create_placeholder_users(missing))
+
+    existing = dict(
+        QuizAccess.objects
+        .filter(quiz=quiz, participant_id__in=user_ids.values())
+        .values_list("participant_id", "access_type")
+    )
+
+    outcomes, rows = [], []
+    for username in usernames:
+        user_id = user_ids[username]
+        if user_id == quiz.participant_id:
+            outcomes.append((username, "owner"))
+        elif existing.get(user_id) == access_type:
+            outcomes.append((username, "unchanged"))
+        else:
+            outcomes.append((username, "updated" if user_id in existing else "created"))
+            rows.append(QuizAccess(quiz=quiz, participant_id=user_id, access_type=access_type, granted_by=granted_by))
+
+    if rows:
+        # MySQL upserts through ON DUPLICATE KEY and rejects an explicit target.
+        unique_fields = ["quiz", "participant"] if connection.features.supports_update_conflicts_with_target else None
+        with transaction.atomic():
+            QuizAccess.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=["access_type", "granted_by"],
+            )
+        # bulk_create skips post_save, so invalidate the cached listings here.
+        bump_namespace_version("quizzes")
+    return outcomes
@@ -6,7 +6,10 @@ from .models import (
     QuizAccess, 
     RetryQuizScore, 
     RetrySession, 
-    QuizCategory
+    QuizCategory,
+    AccessGroup,
+    AccessGroupMembership,
+    QuizGroupAccess,
     )
 
 @admin.register(QuizCategory)
@@ -18,12 +21,28 @@ class QuizAccessInline(admin.TabularInline):
     model = QuizAccess
     extra = 1
 
+class QuizGroupAccessInline(admin.TabularInline):
+    model = QuizGroupAccess
+    extra = 1
+
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
     list_display = ("name", "sheet_url", "is_active", "status")
     search_fields = ("name",)
     list_filter = ("is_active", "status")
-    inlines = [QuizAccessInline]
+    inlines = [QuizAccessInline, QuizGroupAccessInline]
+
+class AccessGroupMembershipInline(admin.TabularInline):
+    model = AccessGroupMembership
+    raw_id_fields = ("user",)
+    extra = 1
+
+@admin.register(AccessGroup)
+class AccessGroupAdmin(admin.ModelAdmin):
+    list_display = ("name", "owner", "created_date")
+    search_fields = ("name", "owner__username")
+    raw_id_fields = ("owner",)
+    inlines = [AccessGroupMembershipInline]
 
 @admin.register(QuizScore)
 class QuizScoreAdmin(admin.ModelAdmin):
@@ -0,0 +1,77 @@
+import csv
+import json
+from django.http import StreamingHttpResponse
+from .models import QuizScore, RetryQuizScore
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ("csv", "ndjson")
+
+HISTORY_COLUMNS = ["type", "score_id", "quiz_name", "score", "total_questions", "start_time", "end_time"]
+RESULTS_COLUMNS = ["type", "score_id", "participant", "score", "total_questions", "start_time", "end_time"]
+
+class Echo:
+    """File-like object whose write() hands the value back, so csv.writer yields lines instead of buffering."""
+    def write(self, value):
+        return value
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+def _keyset_batches(queryset, fields):
+    """
+    Yield value tuples (the id first) in primary-key batches of
+    EXPORT_CHUNK_SIZE. Each batch is its own short query, so memory stays flat
+    even on MySQL, whose driver buffers a whole result set in memory and
+    would read all of a server-side .iterator() at once.
+    """
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by("id").values_list("id", *fields)[:EXPORT_CHUNK_SIZE])
+        yield from batch
+        if len(batch) < EXPORT_CHUNK_SIZE:
+            return
+        last_id = batch[-1][0]
+
+def _score_rows(scores, retries, label_field):
+    attempts = _keyset_batches(scores, (label_field, "score", "total_questions", "start_time", "end_time"))
+    for score_id, label, score, total, start, end in attempts:
+        yield ["attempt", score_id, label, score, total, _isoformat(start), _isoformat(end)]
+
+    retry_attempts = _keyset_batches(
+        retries,
+        ("original_score_id", f"original_score__{label_field}", "score", "total_questions", "start_time", "end_time"),
+    )
+    for _, score_id, label, score, total, start, end in retry_attempts:
+        yield ["retry", score_id, label, score, total, _isoformat(start), _isoformat(end)]
+
+def score_history_rows(user):
+    return _score_rows(
+        QuizScore.objects.filter(participant=user),
+        RetryQuizScore.objects.filter(original_score__participant=user),
+        "quiz__name",
+    )
+
+def quiz_results_rows(quiz):
+    return _score_rows(
+        QuizScore.objects.filter(quiz=quiz),
+        RetryQuizScore.objects.filter(original_score__quiz=quiz),
+        "participant__username",
+    )
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+def _ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row))) + "\n"
+
+def streaming_export_response(columns, rows, export_format, filename):
+    if export_format == "csv":
+        response = StreamingHttpResponse(_csv_lines(columns, rows), content_type="text/csv")
+    else:
+        response = StreamingHttpResponse(_ndjson_lines(columns, rows), content_type="application/x-ndjson")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from quiz_app import views  # noqa: F401  registers the cached endpoints
+from quiz_app.response_cache import CACHED_ENDPOINTS, get_response_cache_stats
+
+class Command(BaseCommand):
+    help = "Report response cache hit rates per endpoint."
+
+    def handle(self, *args, **options):
+        for endpoint in CACHED_ENDPOINTS:
+            stats = get_response_cache_stats(endpoint)
+            self.stdout.write(
+                f"{endpoint}: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['hit_rate']:.1%} hit rate"
+            )
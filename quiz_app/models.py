@@ -1,6 +1,6 @@
 from django.db import models
 from django.utils import timezone
-from django.db.models import JSONField, Q
+from django.db.models import Exists, JSONField, OuterRef, Q
 from django.contrib.auth.models import User
 from .constant import STATUS_CHOICES, ACCESS_TYPE_CHOICES
 from mptt.models import MPTTModel
@@ -18,13 +18,31 @@ class QuizCategory(MPTTModel):
     def __str__(self):
         return self.name
 
+def granted_access_q(user, quiz_ref="pk"):
+    """
+    Q matching quizzes granted to `user` directly or through an access group.
+    Each branch is an EXISTS probe on a unique index, so the result never
+    needs DISTINCT however many grants overlap.
+    """
+    return (
+        Exists(QuizAccess.objects.filter(quiz_id=OuterRef(quiz_ref), participant=user)) |
+        Exists(QuizGroupAccess.objects.filter(quiz_id=OuterRef(quiz_ref), group__memberships__user=user))
+    )
+
+def strongest_access_type(access_types):
+    if "full_access" in access_types:
+        return "full_access"
+    if "participate_access" in access_types:
+        return "participate_access"
+    return None
+
 class QuizManager(models.Manager):
     def available_to_user(self, user):
         return self.filter(
             Q(status='public') |
             Q(participant=user) |
-            Q(accesses__participant=user)
-        ).distinct()
+            granted_access_q(user)
+        )
     
 class Quiz(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -43,23 +61,16 @@ class Quiz(models.Model):
         return self.name
     
     def get_access_type(self, user):
-        if self.participant == user:
-            return "full_access"
-        access = self.accesses.filter(participant=user).first()
-        return access.access_type if access else None
+        from .access import QuizPermissions
+        return QuizPermissions(user).access_type(self)
 
     def is_accessible_by(self, user):
-        return (
-            self.status == "public" or
-            self.participant == user or
-            self.accesses.filter(participant=user).exists()
-        )
+        from .access import QuizPermissions
+        return QuizPermissions(user).is_accessible(self)
 
     def can_participant_edit(self, user):
-        if self.participant == user:
-            return True
-        access = self.accesses.filter(participant=user, access_type="full_access").first()
-        return bool(access)
+        from .access import QuizPermissions
+        return QuizPermissions(user).can_edit(self)
 
 class QuizAccess(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="accesses")
@@ -76,6 +87,42 @@ class QuizAccess(models.Model):
     def __str__(self):
         return f"{self.participant} has {self.access_type} to {self.quiz.name}"
 
+class AccessGroup(models.Model):
+    """A named set of users (a class, a team) that quizzes can be shared with in one grant."""
+    name = models.CharField(max_length=255)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="owned_access_groups")
+    members = models.ManyToManyField(User, through="AccessGroupMembership", related_name="access_groups", blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+class AccessGroupMembership(models.Model):
+    group = models.ForeignKey(AccessGroup, on_delete=models.CASCADE, related_name="memberships")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="access_group_memberships")
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("group", "user")
+
+    def __str__(self):
+        return f"{self.user} in {self.group}"
+
+class QuizGroupAccess(models.Model):
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="group_accesses")
+    group = models.ForeignKey(AccessGroup, on_delete=models.CASCADE, related_name="quiz_accesses")
+    granted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="granted_group_accesses")
+    access_type = models.CharField(max_length=20, choices=ACCESS_TYPE_CHOICES, default="participate_access")
+    granted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("quiz", "group")
+        verbose_name = "Quiz Group Access"
+        verbose_name_plural = "Quiz Group Accesses"
+
+    def __str__(self):
+        return f"{self.group} has {self.access_type} to {self.quiz.name}"
+
 class QuizScore(models.Model):
     participant = models.ForeignKey(User, on_delete=models.CASCADE, related_name="scores")
     quiz = models.ForeignKey("Quiz", on_delete=models.CASCADE, related_name="scores")
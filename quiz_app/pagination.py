@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 class QuizPagination(PageNumberPagination):
     page_size = 4
@@ -9,3 +9,14 @@ class RetryableScoresPagination(PageNumberPagination):
     page_size = 9
     page_size_query_param = "page_size"
     max_page_size = 50
+
+class ParticipatedQuizzesPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+
+class QuizAccessCursorPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    ordering = "-id"
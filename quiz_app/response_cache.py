@@ -0,0 +1,84 @@
+import hashlib
+import time
+from functools import wraps
+from django.core.cache import cache
+from rest_framework.response import Response
+
+VERSION_KEY = "response_cache_version:{namespace}"
+STATS_KEY = "response_cache_stats:{endpoint}:{outcome}"
+CACHED_ENDPOINTS = []
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+def get_namespace_version(namespace):
+    key = VERSION_KEY.format(namespace=namespace)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never restarts at a version
+        # that older cached responses were stored under.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+def bump_namespace_version(*namespaces):
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace=namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+def get_response_cache_stats(endpoint):
+    hits = cache.get(STATS_KEY.format(endpoint=endpoint, outcome="hit"), 0)
+    misses = cache.get(STATS_KEY.format(endpoint=endpoint, outcome="miss"), 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+def get_response_cache_key(request, endpoint, namespaces, per_user):
+    scope = f"user:{request.user.id}" if per_user else "global"
+    versions = ":".join(
+        f"{namespace}{get_namespace_version(namespace)}" for namespace in namespaces
+    )
+    params = "&".join(
+        f"{name}={','.join(values)}" for name, values in sorted(request.GET.lists())
+    )
+    digest = hashlib.md5(params.encode()).hexdigest()
+    return f"response_cache:{endpoint}:{scope}:{versions}:{digest}"
+
+def cached_response(*namespaces, per_user=True, timeout=60):
+    """
+    Cache a view handler's successful responses, keyed on the user scope, the
+    query string and the current version of every namespace it depends on.
+    Model changes bump the namespace versions (see quiz_app.signals): new or
+    deleted attempts bump "attempts", so only the listings that show attempt
+    statistics depend on it. Stale entries are never read; the timeout only
+    bounds how long unused entries occupy the cache.
+    """
+    def decorator(handler):
+        endpoint = handler.__qualname__.split(".")[0]
+        CACHED_ENDPOINTS.append(endpoint)
+
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            cache_key = get_response_cache_key(request, endpoint, namespaces, per_user)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                _incr(STATS_KEY.format(endpoint=endpoint, outcome="hit"))
+                return Response(cached)
+
+            _incr(STATS_KEY.format(endpoint=endpoint, outcome="miss"))
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(cache_key, response.data, timeout=timeout)
+            return response
+        return wrapper
+    return decorator
@@ -15,6 +15,7 @@ class QuizSerializer(serializers.ModelSerializer):
     retry_count = serializers.SerializerMethodField()
     total_questions = serializers.SerializerMethodField()
     quiz_creator = serializers.SerializerMethodField()
+    access_type = serializers.SerializerMethodField()
 
     class Meta:
         model = Quiz
@@ -22,6 +23,7 @@ class QuizSerializer(serializers.ModelSerializer):
             "id", "name", "sheet_url", "status", "is_active", "created_date",
             "category", "total_participants", "total_attempts",
             "last_attempt_time", "retry_count", "total_questions", "quiz_creator",
+            "access_type",
         ]
 
     def get_total_participants(self, obj):
@@ -47,6 +49,10 @@ class QuizSerializer(serializers.ModelSerializer):
         
     def get_quiz_creator(self, obj):  # 👈 new method
         return obj.participant.username if obj.participant else None
+
+    def get_access_type(self, obj):
+        permissions = self.context.get("quiz_permissions")
+        return permissions.access_type(obj) if permissions else None
         
 class QuizAccessSerializer(serializers.ModelSerializer):
     participant_username = serializers.CharField(source="participant.username", read_only=True)
@@ -1 +1,54 @@
 # signals.py for quiz_app app
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import AccessGroup, AccessGroupMembership, Quiz, QuizAccess, QuizCategory, QuizGroupAccess, QuizScore, RetryQuizScore
+from .utils import invalidate_category_tree, invalidate_public_category_counts
+from .response_cache import bump_namespace_version
+
+@receiver(post_save, sender=QuizCategory)
+@receiver(post_delete, sender=QuizCategory)
+def clear_category_tree_cache(sender, instance, **kwargs):
+    invalidate_category_tree()
+    invalidate_public_category_counts()
+    bump_namespace_version("categories")
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def clear_public_category_counts_on_quiz_change(sender, instance, **kwargs):
+    invalidate_public_category_counts()
+    bump_namespace_version("quizzes")
+
+@receiver(m2m_changed, sender=Quiz.category.through)
+def clear_public_category_counts_on_category_assignment(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_public_category_counts()
+        bump_namespace_version("quizzes")
+
+@receiver(post_save, sender=QuizAccess)
+@receiver(post_delete, sender=QuizAccess)
+@receiver(post_save, sender=QuizGroupAccess)
+@receiver(post_delete, sender=QuizGroupAccess)
+@receiver(post_save, sender=AccessGroupMembership)
+@receiver(post_delete, sender=AccessGroupMembership)
+def bump_quizzes_version_on_access_change(sender, instance, **kwargs):
+    bump_namespace_version("quizzes")
+
+@receiver(m2m_changed, sender=AccessGroup.members.through)
+def bump_quizzes_version_on_membership_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_namespace_version("quizzes")
+
+@receiver(post_save, sender=QuizScore)
+@receiver(post_save, sender=RetryQuizScore)
+def bump_attempts_version_on_new_attempt(sender, instance, created, **kwargs):
+    # Quiz listings carry attempt statistics (total_attempts, retry_count,
+    # last_attempt_time), which only change when an attempt is added or removed;
+    # the per-answer saves of a running attempt leave them alone.
+    if created:
+        bump_namespace_version("attempts")
+
+@receiver(post_delete, sender=QuizScore)
+@receiver(post_delete, sender=RetryQuizScore)
+def bump_attempts_version_on_deleted_attempt(sender, instance, **kwargs):
+    bump_namespace_version("attempts")
+
@@ -1,3 +1,406 @@
-from django.test import TestCase
+from django.test import TestCase, RequestFactory
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+import json
+from unittest import mock
+from quiz_app.models import Quiz, QuizAccess, QuizCategory, QuizScore, RetryQuizScore, AccessGroup, QuizGroupAccess
+from quiz_app.views import MyQuizzesView, ParticipatedQuizzesView, ExportScoreHistoryView, ExportQuizResultsView, BulkGrantQuizAccessView, QuizAccessListView
+from user_profile.handles import username_resolver
+from quiz_app.access import QuizPermissions
+from quiz_app.response_cache import get_response_cache_key, get_response_cache_stats
+from quiz_app.exports import score_history_rows
+from quiz_app.utils import (
+    CATEGORY_TREE_CACHE_KEY,
+    CATEGORY_TREE_CACHE_TIMEOUT,
+    PUBLIC_CATEGORY_COUNTS_CACHE_TIMEOUT,
+    build_category_tree,
+    category_subtree_q,
+    get_category_tree_shape,
+    get_public_category_counts,
+    get_rolled_up_category_counts,
+    get_user_category_counts,
+)
+
+class CategoryTreeTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='creator')
+        self.science = QuizCategory.objects.create(name='Science')
+        self.physics = QuizCategory.objects.create(name='Physics', parent=self.science)
+        self.optics = QuizCategory.objects.create(name='Optics', parent=self.physics)
+        self.history = QuizCategory.objects.create(name='History')
+
+        self.physics_quiz = self.make_quiz('Physics 101', self.physics)
+        self.optics_quiz = self.make_quiz('Optics 101', self.optics, self.physics)
+        self.private_quiz = self.make_quiz('Secret', self.science, status='private')
+
+    def make_quiz(self, name, *categories, status='public'):
+        quiz = Quiz.objects.create(
+            name=name,
+            sheet_url=f'https://example.com/{name.replace(" ", "-")}.csv',
+            status=status,
+        )
+        quiz.category.set(categories)
+        return quiz
+
+    def test_counts_roll_up_to_ancestors(self):
+        quizzes = Quiz.objects.available_to_user(self.user)
+        counts = get_rolled_up_category_counts(quizzes)
+        self.assertEqual(counts[self.science.id], 2)
+        self.assertEqual(counts[self.physics.id], 2)
+        self.assertEqual(counts[self.optics.id], 1)
+        self.assertEqual(counts[self.history.id], 0)
+
+    def test_tree_is_nested(self):
+        tree = build_category_tree({self.science.id: 3})
+        self.assertEqual([node['name'] for node in tree], ['Science', 'History'])
+        science = tree[0]
+        self.assertEqual(science['quiz_count'], 3)
+        self.assertEqual(science['children'][0]['name'], 'Physics')
+        self.assertEqual(science['children'][0]['children'][0]['name'], 'Optics')
+
+    def test_subtree_filter_includes_descendants(self):
+        quizzes = Quiz.objects.filter(category_subtree_q(self.physics.id)).distinct()
+        self.assertEqual(set(quizzes), {self.physics_quiz, self.optics_quiz})
+
+    def test_subtree_filter_ignores_stale_cached_shape(self):
+        stale = get_category_tree_shape()
+        acoustics = QuizCategory.objects.create(name='Acoustics', parent=self.physics)
+        acoustics_quiz = self.make_quiz('Acoustics 101', acoustics)
+        # Another worker still holds the shape from before the rebalance.
+        cache.set(CATEGORY_TREE_CACHE_KEY, stale)
+        self.assertIn(acoustics_quiz, Quiz.objects.filter(category_subtree_q(self.physics.id)))
+        self.assertFalse(Quiz.objects.filter(category_subtree_q(10**6)).exists())
+
+    def test_tree_shape_cache_is_bounded(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            get_category_tree_shape()
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], CATEGORY_TREE_CACHE_TIMEOUT)
+
+    def test_tree_cache_invalidated_on_category_edit(self):
+        build_category_tree({})
+        QuizCategory.objects.create(name='Chemistry', parent=self.science)
+        tree = build_category_tree({})
+        names = [child['name'] for child in tree[0]['children']]
+        self.assertIn('Chemistry', names)
+
+class UserCategoryCountsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(username='owner')
+        self.student = User.objects.create(username='student')
+        self.other = User.objects.create(username='other')
+        self.category = QuizCategory.objects.create(name='Maths')
+        self.public_quiz = Quiz.objects.create(name='Algebra', sheet_url='https://example.com/a.csv')
+        self.private_quiz = Quiz.objects.create(
+            name='Calculus', sheet_url='https://example.com/c.csv', status='private', participant=self.owner,
+        )
+        self.public_quiz.category.add(self.category)
+        self.private_quiz.category.add(self.category)
+        QuizAccess.objects.create(quiz=self.private_quiz, participant=self.student)
+
+    def count_for(self, user):
+        counts = {c['id']: c['quiz_count'] for c in get_user_category_counts(user)}
+        return counts[self.category.id]
+
+    def test_public_counts_plus_user_delta(self):
+        self.assertEqual(self.count_for(self.owner), 2)
+        self.assertEqual(self.count_for(self.student), 2)
+        self.assertEqual(self.count_for(self.other), 1)
+
+    def test_public_counts_invalidated_on_quiz_change(self):
+        self.assertEqual(self.count_for(self.other), 1)
+        self.private_quiz.status = 'public'
+        self.private_quiz.save()
+        self.assertEqual(self.count_for(self.other), 2)
+        self.public_quiz.category.remove(self.category)
+        self.assertEqual(self.count_for(self.other), 1)
+
+    def test_public_counts_cache_is_bounded(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            get_public_category_counts()
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], PUBLIC_CATEGORY_COUNTS_CACHE_TIMEOUT)
+
+class ResponseCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(username='reader')
+
+    def cache_key(self, path='/api/quiz/get_my_quizzes/?page=1'):
+        request = self.factory.get(path)
+        request.user = self.user
+        return get_response_cache_key(request, 'MyQuizzesView', ('categories', 'quizzes', 'attempts'), True)
+
+    def test_key_changes_when_quizzes_change(self):
+        before = self.cache_key()
+        self.assertEqual(before, self.cache_key())
+        Quiz.objects.create(name='New', sheet_url='https://example.com/new.csv', participant=self.user)
+        self.assertNotEqual(before, self.cache_key())
+
+    def test_key_depends_on_query_params(self):
+        self.assertNotEqual(self.cache_key(), self.cache_key('/api/quiz/get_my_quizzes/?page=2'))
+
+    def test_stats_default_to_zero(self):
+        self.assertEqual(get_response_cache_stats('MyQuizzesView')['hit_rate'], 0.0)
+
+    def test_new_attempts_show_up_in_cached_listing(self):
+        quiz = Quiz.objects.create(name='Stats', sheet_url='https://example.com/stats.csv', participant=self.user)
+
+        def listing():
+            request = APIRequestFactory().get('/api/quiz/get_my_quizzes/')
+            force_authenticate(request, self.user)
+            return MyQuizzesView.as_view(throttle_classes=[])(request).data['results'][0]
+
+        with mock.patch('quiz_app.utils.get_questions_from_sheet', return_value=[]):
+            self.assertEqual(listing()['total_attempts'], 0)
+            self.assertEqual(listing()['total_attempts'], 0)
+            self.assertEqual(get_response_cache_stats('MyQuizzesView')['hits'], 1)
+
+            score = QuizScore.objects.create(participant=self.user, quiz=quiz, score=1, total_questions=1)
+            self.assertEqual(listing()['total_attempts'], 1)
+
+            RetryQuizScore.objects.create(original_score=score, score=1)
+            self.assertEqual(listing()['retry_count'], 1)
+
+    def test_answer_saves_keep_cached_listings(self):
+        quiz = Quiz.objects.create(name='Busy', sheet_url='https://example.com/busy.csv', participant=self.user)
+        score = QuizScore.objects.create(participant=self.user, quiz=quiz, score=0, total_questions=3)
+        before = self.cache_key()
+        request = self.factory.get('/api/quiz/categories/')
+        request.user = self.user
+        categories_before = get_response_cache_key(request, 'CategoriesWithQuizzesView', ('categories', 'quizzes'), True)
+
+        score.score = 1
+        score.save()
+        self.assertEqual(before, self.cache_key())
+
+        QuizScore.objects.create(participant=self.user, quiz=quiz, score=0, total_questions=3)
+        self.assertNotEqual(before, self.cache_key())
+        self.assertEqual(categories_before, get_response_cache_key(request, 'CategoriesWithQuizzesView', ('categories', 'quizzes'), True))
+
+class ParticipatedQuizzesViewTest(TestCase):
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = ParticipatedQuizzesView.as_view(throttle_classes=[])
+        self.user = User.objects.create(username='player')
+        for i in range(12):
+            quiz = Quiz.objects.create(name=f'Quiz {i}', sheet_url=f'https://example.com/{i}.csv')
+            QuizScore.objects.create(
+                participant=self.user,
+                quiz=quiz,
+                missed_questions=[{'index': 0, 'question': 'q'}],
+                end_time=timezone.now() if i % 2 else None,
+            )
+
+    def get(self, query=''):
+        request = self.factory.get(f'/api/quiz/get_participated_quizzes/{query}')
+        force_authenticate(request, self.user)
+        return self.view(request)
+
+    def test_paginated_without_per_row_queries(self):
+        with self.assertNumQueries(2):
+            response = self.get()
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertTrue(response.data['results'][0]['quiz_name'].startswith('Quiz'))
+
+    def test_filters(self):
+        self.assertEqual(self.get('?status=completed').data['count'], 6)
+        self.assertEqual(self.get('?status=in_progress').data['count'], 6)
+        quiz = Quiz.objects.get(name='Quiz 3')
+        self.assertEqual(self.get(f'?quiz_id={quiz.id}').data['count'], 1)
+        today = timezone.now().date().isoformat()
+        self.assertEqual(self.get(f'?date_from={today}&date_to={today}').data['count'], 12)
+        self.assertEqual(self.get('?date_from=yesterday').status_code, 400)
+
+    def test_invalid_parameters_return_400(self):
+        for query in ('?date_from=2024-02-30', '?date_to=yesterday', '?quiz_id=abc', '?status=done'):
+            response = self.get(query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIsInstance(response.data['error'], str)
+
+class ExportViewsTest(TestCase):
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.owner = User.objects.create(username='owner')
+        self.player = User.objects.create(username='player')
+        self.quiz = Quiz.objects.create(name='Export', sheet_url='https://example.com/e.csv', participant=self.owner)
+        score = QuizScore.objects.create(
+            participant=self.player, quiz=self.quiz, score=1, total_questions=2,
+            missed_questions=[{'index': 1, 'question': 'q'}],
+        )
+        RetryQuizScore.objects.create(original_score=score, score=1)
+
+    def get(self, view_class, user, query):
+        request = self.factory.get(f'/export/{query}')
+        force_authenticate(request, user)
+        return view_class.as_view(throttle_classes=[])(request)
+
+    def test_history_csv_streams_attempts_and_retries(self):
+        response = self.get(ExportScoreHistoryView, self.player, '')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['type', 'score_id', 'quiz_name'])
+        self.assertTrue(lines[1].startswith('attempt,'))
+        self.assertTrue(lines[2].startswith('retry,'))
+
+    def test_results_ndjson_for_owner_only(self):
+        response = self.get(ExportQuizResultsView, self.owner, f'?quiz_id={self.quiz.id}&export_format=ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['participant'] for row in rows], ['player', 'player'])
+        response = self.get(ExportQuizResultsView, self.player, f'?quiz_id={self.quiz.id}')
+        self.assertEqual(response.status_code, 403)
+
+    def test_rows_are_read_in_keyset_batches(self):
+        for _ in range(4):
+            QuizScore.objects.create(participant=self.player, quiz=self.quiz, score=2, total_questions=2)
+        with mock.patch('quiz_app.exports.EXPORT_CHUNK_SIZE', 2):
+            with self.assertNumQueries(4):  # attempts in batches of 2, 2 and 1, then the retry
+                rows = list(score_history_rows(self.player))
+        self.assertEqual([row[0] for row in rows], ['attempt'] * 5 + ['retry'])
+        ids = [row[1] for row in rows[:5]]
+        self.assertEqual(ids, sorted(set(ids)))
+
+class BulkGrantQuizAccessViewTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        username_resolver.clear()
+        self.factory = APIRequestFactory()
+        self.owner = User.objects.create(username='owner')
+        self.existing = User.objects.create(username='Existing')
+        self.quiz = Quiz.objects.create(name='Cohort', sheet_url='https://example.com/c.csv', participant=self.owner, status='private')
+        QuizAccess.objects.create(quiz=self.quiz, participant=self.existing, access_type='participate_access')
+
+    def post(self, user, data):
+        request = self.factory.post('/bulk/', data, format='json')
+        force_authenticate(request, user)
+        return BulkGrantQuizAccessView.as_view(throttle_classes=[])(request)
+
+    def test_grants_and_reports_outcomes(self):
+        response = self.post(self.owner, {
+            'quiz_id': self.quiz.id,
+            'usernames': ['@existing', 'newcomer', 'OWNER', 'newcomer'],
+            'access_type': 'full_access',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['username'], row['outcome']) for row in response.data['results']],
+            [('existing', 'updated'), ('newcomer', 'created'), ('owner', 'owner')],
+        )
+        self.assertEqual(
+            dict(self.quiz.accesses.values_list('participant__username', 'access_type')),
+            {'Existing': 'full_access', 'newcomer': 'full_access'},
+        )
+        newcomer = User.objects.get(username='newcomer')
+        self.assertFalse(newcomer.has_usable_password())
+        self.assertEqual(username_resolver.resolve('newcomer'), newcomer.id)
+
+    def test_repeat_grant_is_unchanged(self):
+        response = self.post(self.owner, {'quiz_id': self.quiz.id, 'usernames': ['existing']})
+        self.assertEqual(response.data['summary']['unchanged'], 1)
+
+    def test_requires_full_access(self):
+        response = self.post(self.existing, {'quiz_id': self.quiz.id, 'usernames': ['someone']})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(User.objects.filter(username='someone').exists())
+
+class AccessGroupTest(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(username='teacher')
+        self.students = [User.objects.create(username=f'student{i}') for i in range(3)]
+        self.outsider = User.objects.create(username='outsider')
+        self.group = AccessGroup.objects.create(name='Class A', owner=self.owner)
+        self.group.members.add(*self.students)
+        self.quiz = Quiz.objects.create(name='Shared', sheet_url='https://example.com/s.csv', participant=self.owner, status='private')
+        QuizGroupAccess.objects.create(quiz=self.quiz, group=self.group)
+
+    def test_members_reach_quiz_through_group(self):
+        self.assertTrue(self.quiz.is_accessible_by(self.students[0]))
+        self.assertFalse(self.quiz.is_accessible_by(self.outsider))
+        self.assertEqual(self.quiz.get_access_type(self.students[0]), 'participate_access')
+        self.assertEqual(list(Quiz.objects.available_to_user(self.students[1])), [self.quiz])
+        self.assertEqual(list(Quiz.objects.available_to_user(self.outsider)), [])
+
+    def test_strongest_grant_wins_without_duplicates(self):
+        QuizAccess.objects.create(quiz=self.quiz, participant=self.students[0], access_type='full_access')
+        other = AccessGroup.objects.create(name='Class B', owner=self.owner)
+        other.members.add(self.students[0])
+        QuizGroupAccess.objects.create(quiz=self.quiz, group=other)
+        self.assertEqual(self.quiz.get_access_type(self.students[0]), 'full_access')
+        self.assertTrue(self.quiz.can_participant_edit(self.students[0]))
+        self.assertEqual(Quiz.objects.available_to_user(self.students[0]).count(), 1)
+
+class QuizPermissionsTest(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(username='maker')
+        self.user = User.objects.create(username='reader')
+        self.quizzes = [
+            Quiz.objects.create(name=f'Page {i}', sheet_url=f'https://example.com/p{i}.csv', participant=self.owner, status='private')
+            for i in range(4)
+        ]
+        QuizAccess.objects.create(quiz=self.quizzes[0], participant=self.user, access_type='full_access')
+        group = AccessGroup.objects.create(name='Readers', owner=self.owner)
+        group.members.add(self.user)
+        QuizGroupAccess.objects.create(quiz=self.quizzes[1], group=group)
+        self.own = Quiz.objects.create(name='Mine', sheet_url='https://example.com/mine.csv', participant=self.user, status='private')
+
+    def test_page_of_access_types_in_one_query(self):
+        permissions = QuizPermissions(User.objects.get(pk=self.user.pk))
+        quizzes = list(Quiz.objects.filter(pk__in=[q.pk for q in self.quizzes + [self.own]]).order_by('id'))
+        with self.assertNumQueries(1):
+            permissions.prefetch(quizzes)
+            self.assertEqual(
+                [permissions.access_type(quiz) for quiz in quizzes],
+                ['full_access', 'participate_access', None, None, 'full_access'],
+            )
+            self.assertTrue(permissions.can_edit(quizzes[0]))
+            self.assertFalse(permissions.is_accessible(quizzes[2]))
+
+class QuizAccessListViewTest(TestCase):
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.owner = User.objects.create(username='host')
+        self.quiz = Quiz.objects.create(name='Crowd', sheet_url='https://example.com/crowd.csv', participant=self.owner, status='private')
+        for i in range(12):
+            QuizAccess.objects.create(
+                quiz=self.quiz,
+                participant=User.objects.create(username=f'Member{i:02d}'),
+                access_type='full_access' if i < 2 else 'participate_access',
+                granted_by=self.owner,
+            )
+
+    def get(self, user, query):
+        request = self.factory.get(f'/access/{query}')
+        force_authenticate(request, user)
+        return QuizAccessListView.as_view(throttle_classes=[])(request)
+
+    def test_cursor_pages_of_ten(self):
+        response = self.get(self.owner, f'?quiz_id={self.quiz.id}')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][0]['participant_username'], 'Member11')
+        self.assertIsNotNone(response.data['next'])
+
+    def test_prefix_search_and_access_type_filter(self):
+        response = self.get(self.owner, f'?quiz_id={self.quiz.id}&search=@member0&access_type=full_access')
+        self.assertEqual(
+            [row['participant_username'] for row in response.data['results']],
+            ['Member01', 'Member00'],
+        )
+        response = self.get(self.owner, f'?quiz_id={self.quiz.id}&access_type=owner')
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_full_access(self):
+        member = User.objects.get(username='Member05')
+        self.assertEqual(self.get(member, f'?quiz_id={self.quiz.id}').status_code, 403)
 
-# Create your tests here.
@@ -16,10 +16,14 @@ from .views import (
     DeleteQuizView,
     EditQuizNameView,
     GrantQuizAccessView,
+    BulkGrantQuizAccessView,
     QuizAccessListView,
     ListCategoriesView,
     CategoriesWithQuizzesView,
+    CategoryTreeView,
     GetAccessibleQuizzesView,
+    ExportScoreHistoryView,
+    ExportQuizResultsView,
     )
 
 urlpatterns = [
@@ -39,8 +43,12 @@ urlpatterns = [
     path('quiz/delete_quiz/', DeleteQuizView.as_view()),
     path('quiz/edit_quiz_name/', EditQuizNameView.as_view()),
     path("quiz/grant_quiz_access/", GrantQuizAccessView.as_view()),
+    path("quiz/bulk_grant_quiz_access/", BulkGrantQuizAccessView.as_view()),
     path("quiz/get_quiz_access_list/", QuizAccessListView.as_view()),
     path("quiz/list_categories/", ListCategoriesView.as_view()),
     path("quiz/categories_with_quizzes/", CategoriesWithQuizzesView.as_view()),
+    path("quiz/category_tree/", CategoryTreeView.as_view()),
     path("quiz/get_accessible_quizzes/", GetAccessibleQuizzesView.as_view()),
+    path("quiz/export_score_history/", ExportScoreHistoryView.as_view()),
+    path("quiz/export_quiz_results/", ExportQuizResultsView.as_view()),
 ]
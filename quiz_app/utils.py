@@ -4,7 +4,16 @@ from io import StringIO
 from django.core.cache import cache
 import hashlib
 import unicodedata
-from .models import RetrySession
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from .models import Quiz, QuizCategory, RetrySession, granted_access_q
+
+CATEGORY_TREE_CACHE_KEY = "quiz_category_tree"
+# The signals only clear the cache of the process that saved the category, so
+# other workers may serve the old shape for this many seconds.
+CATEGORY_TREE_CACHE_TIMEOUT = 60
+PUBLIC_CATEGORY_COUNTS_CACHE_KEY = "quiz_public_category_counts"
+PUBLIC_CATEGORY_COUNTS_CACHE_TIMEOUT = 60  # bounds staleness in workers the signals did not reach
 
 def normalize(s):
     """Strip whitespace, quotes, and normalize unicode for fair comparison."""
@@ -77,4 +86,126 @@ def get_questions_from_sheet(url):
     return questions
 
 def clear_participant_retry_session(user):
-    RetrySession.objects.filter(participant=user).update(active=False, expecting_answer=False)
\ No newline at end of file
+    RetrySession.objects.filter(participant=user).update(active=False, expecting_answer=False)
+
+def get_category_tree_shape():
+    """
+    Return every category as a flat list ordered by tree position, cached
+    until a category changes or for CATEGORY_TREE_CACHE_TIMEOUT seconds.
+    """
+    shape = cache.get(CATEGORY_TREE_CACHE_KEY)
+    if shape is None:
+        shape = list(
+            QuizCategory.objects
+            .order_by("tree_id", "lft")
+            .values("id", "name", "parent_id", "tree_id", "lft", "rght", "level")
+        )
+        cache.set(CATEGORY_TREE_CACHE_KEY, shape, timeout=CATEGORY_TREE_CACHE_TIMEOUT)
+    return shape
+
+def invalidate_category_tree():
+    cache.delete(CATEGORY_TREE_CACHE_KEY)
+
+def category_subtree_q(category_id, prefix="category__"):
+    """
+    Build a filter matching a category and all of its descendants through the
+    MPTT lft/rght range. The node's range is read by subqueries in the same
+    statement rather than from the cached tree shape, so a rebalance is never
+    filtered on stale values.
+    """
+    try:
+        category_id = int(category_id)
+    except (TypeError, ValueError):
+        return Q(pk__in=[])
+
+    node = QuizCategory.objects.filter(pk=category_id)
+    return Q(**{
+        f"{prefix}tree_id": Subquery(node.values("tree_id")),
+        f"{prefix}lft__gte": Subquery(node.values("lft")),
+        f"{prefix}lft__lte": Subquery(node.values("rght")),
+    })
+
+def get_rolled_up_category_counts(quizzes):
+    """
+    Count the distinct quizzes in each category's subtree in a single query.
+    A quiz tagged with several categories of the same subtree is counted once.
+    """
+    subtree_counts = (
+        Quiz.category.through.objects
+        .filter(
+            quizcategory__tree_id=OuterRef("tree_id"),
+            quizcategory__lft__gte=OuterRef("lft"),
+            quizcategory__lft__lte=OuterRef("rght"),
+            quiz__in=quizzes,
+        )
+        .order_by()
+        .values("quizcategory__tree_id")
+        .annotate(total=Count("quiz", distinct=True))
+        .values("total")
+    )
+    return dict(
+        QuizCategory.objects
+        .annotate(quiz_count=Coalesce(Subquery(subtree_counts), 0))
+        .values_list("id", "quiz_count")
+    )
+
+def build_category_tree(counts):
+    """Nest the cached tree shape into {id, name, quiz_count, children} dicts."""
+    nodes = {}
+    roots = []
+    for category in get_category_tree_shape():
+        node = {
+            "id": category["id"],
+            "name": category["name"],
+            "quiz_count": counts.get(category["id"], 0),
+            "children": [],
+        }
+        nodes[category["id"]] = node
+        parent = nodes.get(category["parent_id"])
+        if parent is not None:
+            parent["children"].append(node)
+        else:
+            roots.append(node)
+    return roots
+
+def get_public_category_counts():
+    """
+    Per-category counts of public quizzes, shared by every user and cached until
+    quizzes or categories change or for PUBLIC_CATEGORY_COUNTS_CACHE_TIMEOUT seconds.
+    """
+    counts = cache.get(PUBLIC_CATEGORY_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = dict(
+            Quiz.category.through.objects
+            .filter(quiz__status="public")
+            .order_by()
+            .values("quizcategory_id")
+            .annotate(total=Count("quiz"))
+            .values_list("quizcategory_id", "total")
+        )
+        cache.set(PUBLIC_CATEGORY_COUNTS_CACHE_KEY, counts, timeout=PUBLIC_CATEGORY_COUNTS_CACHE_TIMEOUT)
+    return counts
+
+def invalidate_public_category_counts():
+    cache.delete(PUBLIC_CATEGORY_COUNTS_CACHE_KEY)
+
+def get_user_category_count_delta(user):
+    """Per-category counts of the non-public quizzes a user owns or was granted access to."""
+    return dict(
+        Quiz.category.through.objects
+        .filter(Q(quiz__participant=user) | granted_access_q(user, quiz_ref="quiz_id"))
+        .exclude(quiz__status="public")
+        .order_by()
+        .values("quizcategory_id")
+        .annotate(total=Count("quiz", distinct=True))
+        .values_list("quizcategory_id", "total")
+    )
+
+def get_user_category_counts(user):
+    counts = dict(get_public_category_counts())
+    for category_id, total in get_user_category_count_delta(user).items():
+        counts[category_id] = counts.get(category_id, 0) + total
+    return [
+        {"id": category["id"], "name": category["name"], "quiz_count": counts.get(category["id"], 0)}
+        for category in get_category_tree_shape()
+    ]
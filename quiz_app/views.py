@@ -1,36 +1,76 @@
 from django.http import JsonResponse
-from django.db.models import Count, Q
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.contrib.auth.models import User
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework import status
 from auth_core.views import PrivateUserViewMixin, PublicViewMixin
+from auth_core.throttling import PermanentBlacklistThrottle, ExportRequestRateThrottle
+from user_profile.handles import normalize_handle, username_resolver
+from user_profile.models import UserHandle
 from .serializers import QuizSerializer, QuizScoreSerializer, QuizCategorySerializer, QuizAccessSerializer, RetryableScoreSerializer
 from .models import Quiz, QuizScore, QuizSession, RetryQuizScore, RetrySession, QuizAccess, QuizCategory
-from .utils import get_questions_from_sheet, normalize, clear_participant_retry_session
-from .pagination import QuizPagination, RetryableScoresPagination
+from .utils import (
+    get_questions_from_sheet,
+    normalize,
+    clear_participant_retry_session,
+    category_subtree_q,
+    get_rolled_up_category_counts,
+    build_category_tree,
+    get_user_category_counts,
+)
+from .pagination import QuizPagination, RetryableScoresPagination, ParticipatedQuizzesPagination, QuizAccessCursorPagination
+from .response_cache import cached_response
+from .access import ACCESS_TYPES, MAX_BULK_GRANT, get_quiz_permissions, grant_access_bulk
+from .exports import (
+    EXPORT_FORMATS,
+    HISTORY_COLUMNS,
+    RESULTS_COLUMNS,
+    score_history_rows,
+    quiz_results_rows,
+    streaming_export_response,
+)
 from django.shortcuts import get_object_or_404
 import json
 import logging
 logger = logging.getLogger(__name__)
 
 class CategoriesWithQuizzesView(PrivateUserViewMixin, APIView):
+    @cached_response("categories", "quizzes")
     def get(self, request):
-        user = request.user
-        quizzes = Quiz.objects.available_to_user(user)
-        categories = (
-            QuizCategory.objects
-            .annotate(quiz_count=Count("quiz", filter=Q(quiz__in=quizzes)))
-        )
+        categories = get_user_category_counts(request.user)
         serializer = QuizCategorySerializer(categories, many=True)
         return Response({"categories": serializer.data})
 
-class GetAccessibleQuizzesView(PrivateUserViewMixin, ListAPIView):
+class CategoryTreeView(PrivateUserViewMixin, APIView):
+    def get(self, request):
+        quizzes = Quiz.objects.available_to_user(request.user)
+        counts = get_rolled_up_category_counts(quizzes)
+        return Response({"categories": build_category_tree(counts)})
+
+class QuizAccessTypeMixin:
+    """Give QuizSerializer the request's QuizPermissions, prefetched for the whole page."""
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["quiz_permissions"] = get_quiz_permissions(self.request)
+        return context
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get("many") and args:
+            get_quiz_permissions(self.request).prefetch(args[0])
+        return super().get_serializer(*args, **kwargs)
+
+class GetAccessibleQuizzesView(PrivateUserViewMixin, QuizAccessTypeMixin, ListAPIView):
     serializer_class = QuizSerializer
     pagination_class = QuizPagination
 
+    @cached_response("categories", "quizzes", "attempts")
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         user = self.request.user
         category_id = self.request.GET.get("category_id")
@@ -39,7 +79,7 @@ class GetAccessibleQuizzesView(PrivateUserViewMixin, ListAPIView):
         queryset = Quiz.objects.available_to_user(user).filter(is_active=True)
 
         if category_id:
-            queryset = queryset.filter(category__id=category_id)
+            queryset = queryset.filter(category_subtree_q(category_id))
 
         if search:
             queryset = queryset.filter(
@@ -122,7 +162,7 @@ class StartQuizView(PrivateUserViewMixin, APIView):
             return Response({"error": "Quiz not found or inactive"}, status=status.HTTP_404_NOT_FOUND)
 
         # Ensure user has access
-        if not quiz.is_accessible_by(user):
+        if not get_quiz_permissions(request).is_accessible(quiz):
             return Response(
                 {"error": "This quiz is private and you do not have access."},
                 status=status.HTTP_403_FORBIDDEN
@@ -277,12 +317,50 @@ class SubmitQuizAnswerView(PrivateUserViewMixin, APIView):
         })
 
     
-class ParticipatedQuizzesView(PrivateUserViewMixin, APIView):
-    def get(self, request):
-        user = request.user
-        scores = QuizScore.objects.filter(participant=user)
-        serializer = QuizScoreSerializer(scores, many=True)
-        return Response(serializer.data)
+class ParticipatedQuizzesView(PrivateUserViewMixin, ListAPIView):
+    serializer_class = QuizScoreSerializer
+    pagination_class = ParticipatedQuizzesPagination
+
+    def get(self, request, *args, **kwargs):
+        params = request.GET
+        self.filters = {}
+
+        quiz_id = params.get("quiz_id")
+        if quiz_id:
+            try:
+                self.filters["quiz_id"] = int(quiz_id)
+            except (TypeError, ValueError):
+                return Response({"error": "Invalid quiz_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        for param, lookup in (("date_from", "start_time__date__gte"), ("date_to", "start_time__date__lte")):
+            value = params.get(param)
+            if not value:
+                continue
+            try:
+                parsed = parse_date(value)
+            except (TypeError, ValueError):
+                parsed = None
+            if not parsed:
+                return Response({"error": f"Invalid {param}. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+            self.filters[lookup] = parsed
+
+        completion = params.get("status", "").strip().lower()
+        if completion == "completed":
+            self.filters["end_time__isnull"] = False
+        elif completion == "in_progress":
+            self.filters["end_time__isnull"] = True
+        elif completion:
+            return Response({"error": "Invalid status. Must be 'completed' or 'in_progress'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return (
+            QuizScore.objects
+            .filter(participant=self.request.user, **self.filters)
+            .select_related("quiz")
+            .only("id", "score", "total_questions", "start_time", "end_time", "attempt_time", "quiz__name")
+        )
 
 class StartRetryView(PrivateUserViewMixin, APIView):
     def post(self, request):
@@ -502,6 +580,7 @@ class ClearRetrySessionView(PrivateUserViewMixin, APIView):
         return JsonResponse({"status": "cleared"})
 
 class ListCategoriesView(PrivateUserViewMixin, APIView):
+    @cached_response("categories", per_user=False)
     def get(self, request):
         categories = QuizCategory.objects.all()
         serializer = QuizCategorySerializer(categories, many=True)
@@ -568,16 +647,20 @@ class AddQuizView(PrivateUserViewMixin, APIView):
             if valid_ids:
                 quiz.category.set(valid_ids)
 
-        serializer = QuizSerializer(quiz)
+        serializer = QuizSerializer(quiz, context={"quiz_permissions": get_quiz_permissions(request)})
         return Response({
             "message": f"✅ Quiz '{quiz.name}' created successfully.",
             "quiz": serializer.data
         })
 
-class MyQuizzesView(PrivateUserViewMixin, ListAPIView):
+class MyQuizzesView(PrivateUserViewMixin, QuizAccessTypeMixin, ListAPIView):
     serializer_class = QuizSerializer
     pagination_class = QuizPagination
 
+    @cached_response("categories", "quizzes", "attempts")
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         user = self.request.user
         category_id = self.request.GET.get("category_id")
@@ -586,7 +669,7 @@ class MyQuizzesView(PrivateUserViewMixin, ListAPIView):
         queryset = Quiz.objects.filter(participant=user).order_by("-id")
 
         if category_id:
-            queryset = queryset.filter(category__id=category_id)
+            queryset = queryset.filter(category_subtree_q(category_id))
 
         if search:
             queryset = queryset.filter(
@@ -635,7 +718,7 @@ class DeleteQuizView(PrivateUserViewMixin, APIView):
 
         try:
             quiz = Quiz.objects.get(pk=quiz_id)
-            if quiz.participant != user:
+            if quiz.participant_id != user.id:
                 return JsonResponse({"error": "Unauthorized"}, status=403)
 
             quiz.delete()
@@ -661,7 +744,7 @@ class EditQuizNameView(PrivateUserViewMixin, APIView):
 
             quiz = Quiz.objects.get(pk=quiz_id)
 
-            if quiz.participant != user:
+            if quiz.participant_id != user.id:
                 return JsonResponse({'error': 'Unauthorized'}, status=403)
 
             quiz.name = new_name
@@ -693,16 +776,16 @@ class GrantQuizAccessView(PrivateUserViewMixin, APIView):
             if not quiz:
                 return JsonResponse({"error": "❗️ This quiz doesn't seem to exist."}, status=404)
 
-            if not (quiz.participant == user or quiz.get_access_type(user) == "full_access"):
+            if not get_quiz_permissions(request).can_edit(quiz):
                 return JsonResponse({"error": "🚫 You don't have permission to manage access for this quiz."}, status=403)
 
-            # Resolve or create target
             # Resolve or create target user
-            target = User.objects.filter(username__iexact=target_username).first()
+            target_id = username_resolver.resolve(target_username)
+            target = User.objects.only("id", "username").filter(id=target_id).first() if target_id else None
             if not target:
                 target = User.objects.create(username=target_username)
 
-            if quiz.participant == target:
+            if quiz.participant_id == target.id:
                 return JsonResponse({
                     "error": "👤 You already have access to this quiz and can't grant access to yourself."
                 }, status=400)
@@ -739,21 +822,114 @@ class GrantQuizAccessView(PrivateUserViewMixin, APIView):
         except json.JSONDecodeError:
             return JsonResponse({"error": "❌ There was a problem reading the request. Please try again."}, status=400)
 
-class QuizAccessListView(PrivateUserViewMixin, APIView):
+class BulkGrantQuizAccessView(PrivateUserViewMixin, APIView):
+    def post(self, request):
+        quiz_id = request.data.get("quiz_id")
+        usernames = request.data.get("usernames")
+        access_type = request.data.get("access_type", "participate_access")
+
+        if not quiz_id or not isinstance(usernames, list) or not usernames:
+            return Response({"error": "quiz_id and a non-empty usernames list are required"}, status=400)
+        if len(usernames) > MAX_BULK_GRANT:
+            return Response({"error": f"At most {MAX_BULK_GRANT} usernames per request"}, status=400)
+        if access_type not in ACCESS_TYPES:
+            return Response({"error": "Invalid access_type"}, status=400)
+        if not all(isinstance(username, str) for username in usernames):
+            return Response({"error": "usernames must be strings"}, status=400)
+
+        quiz = Quiz.objects.filter(id=quiz_id).first()
+        if not quiz:
+            return Response({"error": "Quiz not found"}, status=404)
+
+        if not get_quiz_permissions(request).can_edit(quiz):
+            return Response({"error": "Not authorized"}, status=403)
+
+        outcomes = grant_access_bulk(quiz, usernames, access_type, request.user)
+        summary = {"created": 0, "updated": 0, "unchanged": 0, "owner": 0}
+        for _, outcome in outcomes:
+            summary[outcome] += 1
+        return Response({
+            "results": [{"username": username, "outcome": outcome} for username, outcome in outcomes],
+            "summary": summary,
+        })
+
+class QuizAccessListView(PrivateUserViewMixin, ListAPIView):
+    serializer_class = QuizAccessSerializer
+    pagination_class = QuizAccessCursorPagination
+
+    def get(self, request, *args, **kwargs):
+        quiz_id = request.GET.get("quiz_id")
+        if not quiz_id:
+            return Response({"error": "Missing quiz_id"}, status=400)
+
+        access_type = request.GET.get("access_type")
+        if access_type and access_type not in ACCESS_TYPES:
+            return Response({"error": "Invalid access_type"}, status=400)
+
+        try:
+            self.quiz = Quiz.objects.only("id", "participant_id", "status").get(id=quiz_id)
+        except (Quiz.DoesNotExist, ValueError):
+            return Response({"error": "Quiz not found"}, status=404)
+
+        # Only quiz owner can view access list
+        if not get_quiz_permissions(request).can_edit(self.quiz):
+            return Response({"error": "Not authorized"}, status=403)
+
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        params = self.request.GET
+        access_type = params.get("access_type")
+        search = normalize_handle(params.get("search")).lstrip("@")
+
+        queryset = (
+            QuizAccess.objects
+            .filter(quiz_id=self.quiz.id)
+            .select_related("participant", "granted_by")
+            .only("id", "access_type", "granted_at", "participant__username", "granted_by__username")
+        )
+
+        if access_type:
+            queryset = queryset.filter(access_type=access_type)
+
+        if search:
+            # Prefix match on the lowercased handle index instead of LIKE over auth_user.
+            queryset = queryset.filter(
+                participant__handles__kind=UserHandle.USERNAME,
+                participant__handles__value__startswith=search,
+            )
+
+        return queryset
+
+class ExportScoreHistoryView(PrivateUserViewMixin, APIView):
+    throttle_classes = [PermanentBlacklistThrottle, ExportRequestRateThrottle]
+
+    def get(self, request):
+        export_format = request.GET.get("export_format", "csv").lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "Invalid export_format. Must be 'csv' or 'ndjson'"}, status=400)
+
+        rows = score_history_rows(request.user)
+        return streaming_export_response(HISTORY_COLUMNS, rows, export_format, "score_history")
+
+class ExportQuizResultsView(PrivateUserViewMixin, APIView):
+    throttle_classes = [PermanentBlacklistThrottle, ExportRequestRateThrottle]
+
     def get(self, request):
         quiz_id = request.GET.get("quiz_id")
+        export_format = request.GET.get("export_format", "csv").lower()
         if not quiz_id:
             return Response({"error": "Missing quiz_id"}, status=400)
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "Invalid export_format. Must be 'csv' or 'ndjson'"}, status=400)
 
         try:
             quiz = Quiz.objects.get(id=quiz_id)
         except Quiz.DoesNotExist:
             return Response({"error": "Quiz not found"}, status=404)
 
-        # Only quiz owner can view access list
-        if not (quiz.participant == request.user or quiz.get_access_type(request.user) == "full_access"):
+        if not get_quiz_permissions(request).can_edit(quiz):
             return Response({"error": "Not authorized"}, status=403)
 
-        accesses = quiz.accesses.select_related("participant", "granted_by")
-        serializer = QuizAccessSerializer(accesses, many=True)
-        return Response(serializer.data)
+        rows = quiz_results_rows(quiz)
+        return streaming_export_response(RESULTS_COLUMNS, rows, export_format, f"quiz_{quiz.id}_results")
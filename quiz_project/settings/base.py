@@ -35,14 +35,25 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'auth_core.middleware.PathScopedMiddleware',
+    'auth_core.middleware.HMACAuthMiddleware',
+]
+
+# Browser-only stack, run by PathScopedMiddleware for everything outside
+# LEAN_MIDDLEWARE_PREFIXES (i.e. the admin).
+BROWSER_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'auth_core.middleware.HMACAuthMiddleware',
 ]
+LEAN_MIDDLEWARE_PREFIXES = ['/api/']
+
+# The admin checks look for these middleware in MIDDLEWARE; they are provided
+# through BROWSER_MIDDLEWARE instead.
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'quiz_project.urls'
 
@@ -132,7 +143,6 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTHENTICATION_BACKENDS = [
     'user_profile.auth_backends.EmailOrUsernameModelBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
 REST_FRAMEWORK = {
@@ -144,7 +154,7 @@ REST_FRAMEWORK = {
     },
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'auth_core.authentication.APIKeyAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'auth_core.authentication.LazyJWTAuthentication',
     ],
 }
 
@@ -155,6 +165,7 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_REFRESH_SERIALIZER': 'auth_core.serializers.CachedTokenRefreshSerializer',
 }
 
 # app informations
@@ -165,4 +176,7 @@ CONTACT_EMAIL = os.environ.get('CONTACT_EMAIL')
 FROM_EMAIL = f"{BUSINESS_NAME} <{EMAIL_HOST_USER}>"
 
 # hmac key 
-HMAC_SECRET_KEY = os.environ.get("HMAC_SECRET_KEY")
\ No newline at end of file
+HMAC_SECRET_KEY = os.environ.get("HMAC_SECRET_KEY")
+# Accept the pre-nonce "{timestamp}:{path}" signature from clients that do not
+# send X-Nonce yet. Set HMAC_ACCEPT_LEGACY_SIGNATURES=False once they all do.
+HMAC_ACCEPT_LEGACY_SIGNATURES = os.environ.get("HMAC_ACCEPT_LEGACY_SIGNATURES", "True") == "True"
@@ -0,0 +1,146 @@
+import atexit
+import logging
+import queue
+import threading
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LOGIN = "login"
+LOGOUT = "logout"
+
+class UserActivityWriter:
+    """
+    Bounded in-memory queue of login and logout events drained by a single
+    daemon thread. Each flush writes every queued login with one bulk insert
+    and closes the matching sessions with one bulk update, instead of a new
+    thread and a query per login.
+
+    Backpressure: the queue holds at most `max_queue_size` events. When it is
+    full, new events are dropped and counted rather than blocking a login;
+    metrics() reports the depth, high-water mark and drop count.
+
+    Shutdown: events still queued at interpreter exit are written by an
+    atexit flush. A hard kill loses at most what was queued since the last
+    flush (`flush_interval` seconds or `batch_size` events).
+    """
+    max_queue_size = 10000
+    batch_size = 500
+    flush_interval = 2
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stats = {"enqueued": 0, "dropped": 0, "written": 0, "flushes": 0, "high_water": 0}
+        atexit.register(self.flush)
+
+    def record_login(self, user_id, ip_address, browser_info, device_info, failed_login_attempts):
+        self._put((LOGIN, user_id, timezone.now(), ip_address, browser_info, device_info, failed_login_attempts))
+
+    def record_logout(self, user_id):
+        self._put((LOGOUT, user_id, timezone.now()))
+
+    def _put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+                dropped = self._stats["dropped"]
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning("UserActivity queue full; %s events dropped so far", dropped)
+            return
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats["enqueued"] += 1
+            self._stats["high_water"] = max(self._stats["high_water"], depth)
+        if depth >= self.batch_size:
+            self._wakeup.set()
+        self.start()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="user-activity-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to write UserActivity events")
+            finally:
+                close_old_connections()
+
+    def _drain(self):
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def flush(self):
+        from .models import UserActivity
+        with self._flush_lock:
+            events = self._drain()
+            if not events:
+                return 0
+
+            logins = [event for event in events if event[0] == LOGIN]
+            logouts = {}
+            for event in events:
+                if event[0] == LOGOUT:
+                    logouts[event[1]] = event[2]  # the last logout per user wins
+
+            with transaction.atomic():
+                UserActivity.objects.bulk_create([
+                    UserActivity(
+                        user_id=user_id,
+                        login_time=at,
+                        ip_address=ip_address,
+                        browser_info=browser_info,
+                        device_info=device_info,
+                        failed_login_attempts=failed_login_attempts,
+                        login_successful=True,
+                    )
+                    for _, user_id, at, ip_address, browser_info, device_info, failed_login_attempts in logins
+                ])
+                if logouts:
+                    # Close each user's most recent session, as latest('login_time') did.
+                    latest_ids = (
+                        UserActivity.objects
+                        .filter(user_id__in=logouts)
+                        .values("user_id")
+                        .annotate(latest_id=Max("id"))
+                        .values_list("latest_id", flat=True)
+                    )
+                    sessions = list(UserActivity.objects.filter(id__in=latest_ids).only("id", "user_id", "login_time"))
+                    for session in sessions:
+                        session.logout_time = logouts[session.user_id]
+                        session.session_duration = session.logout_time - session.login_time
+                    UserActivity.objects.bulk_update(sessions, ["logout_time", "session_duration"])
+
+            with self._lock:
+                self._stats["written"] += len(events)
+                self._stats["flushes"] += 1
+            return len(events)
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["capacity"] = self.max_queue_size
+        return stats
+
+activity_writer = UserActivityWriter()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile
+from .models import Profile, EmailOutbox
 # Register your models here.
 
 
@@ -8,4 +8,11 @@ class ProfileAdmin(admin.ModelAdmin):
     readonly_fields = ('user', 'password_reset_token_is_used', 'email_verified', 'password_reset_token_created_on')
     list_filter = ('email_verified', 'is_verified', 'is_active') 
     
-admin.site.register(Profile, ProfileAdmin)
\ No newline at end of file
+admin.site.register(Profile, ProfileAdmin)
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_on', 'sent_on')
+    list_filter = ('status',)
+    search_fields = ('subject',)
+    readonly_fields = ('attempts', 'last_error', 'created_on', 'sent_on')
@@ -1,16 +1,25 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import User
-from django.db.models import Q
+from .handles import find_login_user
 
 class EmailOrUsernameModelBackend(ModelBackend):
+    """
+    Authenticate by username or email through the normalized UserHandle index.
+    Every attempt costs one lookup and one password hash: unknown handles hash
+    against a throwaway user so misses take as long as wrong passwords.
+    """
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            # Try to get the user by either username or email
-            user = User.objects.get(Q(username=username) | Q(email__iexact=username))
-        except User.DoesNotExist:
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
             return None
-        
+
+        user = find_login_user(username)
+        if user is None:
+            User().set_password(password)
+            return None
+
         # Check password and return user if valid
-        if user.check_password(password):
+        if user.check_password(password) and self.user_can_authenticate(user):
             return user
         return None
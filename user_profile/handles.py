@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from django.contrib.auth.models import User
+
+def normalize_handle(value):
+    return (value or "").strip().lower()
+
+def user_handle_values(user):
+    from .models import UserHandle
+    values = {UserHandle.USERNAME: normalize_handle(user.username)}
+    email = normalize_handle(user.email)
+    if email:
+        values[UserHandle.EMAIL] = email
+    return values
+
+def sync_user_handles(user):
+    """Bring the user's UserHandle rows in line with its username and email; writes only on change."""
+    from .models import UserHandle
+    wanted = user_handle_values(user)
+    current = dict(UserHandle.objects.filter(user=user).values_list("kind", "value"))
+    if current == wanted:
+        return
+    username_resolver.forget(*[
+        value for kind, value in current.items()
+        if kind == UserHandle.USERNAME and wanted.get(kind) != value
+    ])
+    stale = [kind for kind, value in current.items() if wanted.get(kind) != value]
+    if stale:
+        UserHandle.objects.filter(user=user, kind__in=stale).delete()
+    UserHandle.objects.bulk_create([
+        UserHandle(user=user, kind=kind, value=value)
+        for kind, value in wanted.items()
+        if current.get(kind) != value
+    ])
+
+def find_login_user(handle):
+    """
+    Return the user whose username or email matches `handle` case-insensitively,
+    in one indexed query. A username match wins over another account's email.
+    """
+    value = normalize_handle(handle)
+    if not value:
+        return None
+    return (
+        User.objects
+        .filter(handles__value=value)
+        .order_by("handles__kind", "id")
+        .first()
+    )
+
+class UsernameResolver:
+    """
+    Map usernames to user ids case-insensitively through the UserHandle index,
+    keeping recent answers in a bounded per-process LRU. Entries live for
+    `ttl` seconds so a username freed by a rename elsewhere is re-read soon;
+    unknown names are never cached.
+    """
+    max_size = 4096
+    ttl = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _cached(self, handle, now):
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[handle]
+                return None
+            self._entries.move_to_end(handle)
+            return entry[1]
+
+    def _remember(self, resolved, now):
+        with self._lock:
+            for handle, user_id in resolved.items():
+                self._entries[handle] = (now + self.ttl, user_id)
+                self._entries.move_to_end(handle)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def resolve_many(self, handles):
+        """
+        Resolve many usernames (a leading "@" is ignored) with at most one
+        query. Returns {normalized handle: user id} for the names that exist.
+        """
+        from .models import UserHandle
+        now = time.monotonic()
+        resolved, missing = {}, set()
+        for handle in handles:
+            handle = normalize_handle(handle).lstrip("@")
+            if not handle or handle in resolved:
+                continue
+            user_id = self._cached(handle, now)
+            if user_id is None:
+                missing.add(handle)
+            else:
+                resolved[handle] = user_id
+
+        if missing:
+            found = {}
+            rows = (
+                UserHandle.objects
+                .filter(kind=UserHandle.USERNAME, value__in=missing)
+                .order_by("user_id")
+                .values_list("value", "user_id")
+            )
+            for value, user_id in rows:
+                found.setdefault(value, user_id)
+            self._remember(found, now)
+            resolved.update(found)
+        return resolved
+
+    def resolve(self, handle):
+        """Return the user id for one username, or None."""
+        return self.resolve_many([handle]).get(normalize_handle(handle).lstrip("@"))
+
+    def forget(self, *handles):
+        with self._lock:
+            for handle in handles:
+                self._entries.pop(normalize_handle(handle), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+username_resolver = UsernameResolver()
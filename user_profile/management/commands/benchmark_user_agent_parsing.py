@@ -0,0 +1,50 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from user_agents import parse
+from user_profile.utils import parse_user_agent, user_agent_cache_stats
+
+UA_TEMPLATES = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{major}.0.{build}.{patch} Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/{minor}.{patch} Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_{minor} like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.{minor} Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; SM-S9{minor}1B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{major}.0.{build}.{patch} Mobile Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:{major}.0) Gecko/20100101 Firefox/{major}.0",
+    "TelegramBot (like TwitterBot) {major}.{minor}",
+]
+
+class Command(BaseCommand):
+    help = "Compare user_agents.parse on every login with the memoized parse_user_agent."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--distinct", type=int, default=300, help="Distinct User-Agent strings in the workload.")
+        parser.add_argument("--lookups", type=int, default=20000, help="Parses to time per strategy.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        distinct = [
+            rng.choice(UA_TEMPLATES).format(
+                major=rng.randint(100, 130), minor=rng.randint(0, 9),
+                build=rng.randint(1000, 6999), patch=rng.randint(0, 200),
+            )
+            for _ in range(options["distinct"])
+        ]
+        # Skewed like real traffic: a few browsers account for most logins.
+        workload = rng.choices(distinct, weights=[1 / (rank + 1) for rank in range(len(distinct))], k=options["lookups"])
+
+        started = time.perf_counter()
+        for ua in workload:
+            parse(ua)
+        uncached_seconds = time.perf_counter() - started
+
+        parse_user_agent.cache_clear()
+        started = time.perf_counter()
+        for ua in workload:
+            parse_user_agent(ua)
+        cached_seconds = time.perf_counter() - started
+
+        lookups = options["lookups"]
+        stats = user_agent_cache_stats()
+        self.stdout.write(f"user_agents.parse:  {uncached_seconds / lookups * 1e6:10.1f} us/parse")
+        self.stdout.write(f"parse_user_agent:   {cached_seconds / lookups * 1e6:10.1f} us/parse")
+        self.stdout.write(f"cache hit rate:     {stats['hit_rate']:10.1%} ({stats['size']} entries)")
@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from user_profile.outbox import send_outbox_batch
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued EmailOutbox rows, one backend connection per batch. "
+        "Use --backend django.core.mail.backends.filebased.EmailBackend (with EMAIL_FILE_PATH) "
+        "or the locmem backend to try it locally without SMTP."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="Emails sent per connection.")
+        parser.add_argument("--backend", default=None, help="Email backend path; defaults to settings.EMAIL_BACKEND.")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting when the outbox is empty.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds to wait between polls with --loop.")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = send_outbox_batch(options["batch_size"], backend=options["backend"])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    continue
+                if not options["loop"]:
+                    break
+                close_old_connections()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} emails, {total_failed} failed attempts."))
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.12 on 2026-10-19 04:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_user_handles(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserHandle = apps.get_model('user_profile', 'UserHandle')
+    batch = []
+    for user_id, username, email in User.objects.values_list('id', 'username', 'email').iterator(chunk_size=2000):
+        batch.append(UserHandle(user_id=user_id, kind=1, value=username.strip().lower()))
+        if email and email.strip():
+            batch.append(UserHandle(user_id=user_id, kind=2, value=email.strip().lower()))
+        if len(batch) >= 2000:
+            UserHandle.objects.bulk_create(batch)
+            batch = []
+    UserHandle.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserHandle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Username'), (2, 'Email')])),
+                ('value', models.CharField(db_index=True, max_length=254)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='handles', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='userhandle',
+            constraint=models.UniqueConstraint(fields=('user', 'kind'), name='unique_user_handle_kind'),
+        ),
+        migrations.RunPython(backfill_user_handles, migrations.RunPython.noop),
+    ]
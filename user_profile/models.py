@@ -40,6 +40,59 @@ class Profile(models.Model):
     def verification_progress(self):
         return utils.verification_progress(self)
 
+class UserHandle(models.Model):
+    """
+    Lowercased copy of a user's username and email in one indexed column, so
+    login and access grants resolve any handle with a single index lookup.
+    Kept in sync by user_profile.handles.sync_user_handles.
+    """
+    USERNAME = 1
+    EMAIL = 2
+    KIND_CHOICES = [(USERNAME, "Username"), (EMAIL, "Email")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="handles")
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    value = models.CharField(max_length=254, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind'], name='unique_user_handle_kind')
+        ]
+
+    def __str__(self):
+        return f"{self.value} ({self.get_kind_display()})"
+
+class EmailOutbox(models.Model):
+    """
+    Email waiting to be delivered by the send_outbox command. Request code
+    only inserts rows; rendering and SMTP happen in the worker.
+    """
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_template = models.CharField(max_length=255, blank=True)
+    context = models.JSONField(default=dict, blank=True)
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    sent_on = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx')]
+        verbose_name = "Email Outbox"
+        verbose_name_plural = "Email Outbox"
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
+
 class UserActivity(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     login_time = models.DateTimeField(default=timezone.now)
@@ -0,0 +1,99 @@
+import logging
+from datetime import timedelta
+from functools import lru_cache
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+CLAIM_LEASE = timedelta(minutes=5)  # a crashed worker's claimed rows become due again after this
+
+def queue_email(subject, body, recipients, html_template="", context=None, from_email=None):
+    """Insert one outbox row; the send_outbox command renders and delivers it."""
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        recipients=list(recipients),
+        html_template=html_template,
+        context=context or {},
+        from_email=from_email or settings.FROM_EMAIL,
+    )
+
+def retry_delay(attempts):
+    """Exponential backoff: 30s, 1m, 2m, 4m, ... capped at an hour."""
+    return min(RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)), RETRY_MAX_DELAY)
+
+@lru_cache(maxsize=32)
+def _compiled_template(name):
+    return get_template(name)
+
+def claim_batch(batch_size):
+    """
+    Lease up to `batch_size` due rows by pushing their next_attempt_at past
+    the lease, so concurrent workers never pick the same email and SMTP runs
+    outside the transaction.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if ids:
+            EmailOutbox.objects.filter(id__in=ids).update(next_attempt_at=now + CLAIM_LEASE)
+    return list(EmailOutbox.objects.filter(id__in=ids).order_by("id"))
+
+def _build_message(item, connection):
+    message = EmailMultiAlternatives(
+        item.subject, item.body, item.from_email, item.recipients, connection=connection,
+    )
+    if item.html_template:
+        message.attach_alternative(_compiled_template(item.html_template).render(item.context), "text/html")
+    return message
+
+def send_outbox_batch(batch_size=50, backend=None):
+    """
+    Deliver one batch of due emails over a single backend connection.
+    Returns (sent, failed) counts; failures are rescheduled with backoff and
+    marked failed after MAX_ATTEMPTS.
+    """
+    items = claim_batch(batch_size)
+    if not items:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection(backend=backend, fail_silently=False)
+    connection.open()
+    try:
+        for item in items:
+            try:
+                _build_message(item, connection).send()
+            except Exception as exc:
+                failed += 1
+                item.attempts += 1
+                item.last_error = f"{type(exc).__name__}: {exc}"
+                if item.attempts >= MAX_ATTEMPTS:
+                    item.status = EmailOutbox.FAILED
+                else:
+                    item.next_attempt_at = timezone.now() + retry_delay(item.attempts)
+                item.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+                logger.warning("Outbox email %s failed (attempt %s): %s", item.id, item.attempts, item.last_error)
+            else:
+                sent += 1
+                item.status = EmailOutbox.SENT
+                item.attempts += 1
+                item.sent_on = timezone.now()
+                item.save(update_fields=["status", "attempts", "sent_on"])
+    finally:
+        connection.close()
+    return sent, failed
@@ -0,0 +1,60 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from .handles import user_handle_values
+from .models import BillingAddress, Profile, Phone, UserHandle
+
+def _handle_rows(users):
+    return [
+        UserHandle(user_id=user.pk, kind=kind, value=value)
+        for user in users
+        for kind, value in user_handle_values(user).items()
+    ]
+
+def provision_user(user):
+    """
+    Create the rows every new account needs (profile, phone, billing address
+    and login handles) in one transaction, one INSERT each. Returns the Profile.
+    """
+    with transaction.atomic():
+        profile = Profile.objects.create(user=user)
+        Phone.objects.create(user=user)
+        BillingAddress.objects.create(user=user)
+        UserHandle.objects.bulk_create(_handle_rows([user]))
+    return profile
+
+def provision_users(users):
+    """
+    Bulk variant of provision_user for imports; `users` must already be saved.
+    Profiles, phones and handles take one INSERT per table whatever the batch
+    size, and conflicts are ignored so re-running an import is safe. Billing
+    addresses use multi-table inheritance, which bulk_create cannot insert,
+    so BillingAddressView creates them on first use.
+    """
+    users = list(users)
+    if not users:
+        return
+    with transaction.atomic():
+        Profile.objects.bulk_create([Profile(user_id=user.pk) for user in users], ignore_conflicts=True)
+        Phone.objects.bulk_create([Phone(user_id=user.pk) for user in users], ignore_conflicts=True)
+        UserHandle.objects.bulk_create(_handle_rows(users), ignore_conflicts=True)
+
+def create_placeholder_users(usernames):
+    """
+    Create bare accounts (unusable password, no email) for `usernames` with a
+    fixed number of queries, and return {username: user id} for every name,
+    including ones that already existed.
+    """
+    usernames = list(dict.fromkeys(usernames))
+    if not usernames:
+        return {}
+
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [User(username=username, password=make_password(None)) for username in usernames],
+            ignore_conflicts=True,
+        )
+        # Re-read ids: MySQL does not return primary keys from bulk inserts.
+        user_ids = dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+        provision_users([User(id=user_id, username=username) for username, user_id in user_ids.items()])
+    return user_ids
@@ -1,58 +1,54 @@
 from django.contrib.auth.models import User
-from .models import Profile, UserActivity, Phone, BillingAddress
+from .activity import activity_writer
+from .handles import sync_user_handles, username_resolver
+from .provisioning import provision_user
+from django.db import transaction
 from django.contrib.auth.signals import user_logged_in, user_logged_out
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils import timezone
-from user_agents import parse
-import threading
-from concurrent.futures import ThreadPoolExecutor
+from .utils import parse_user_agent
+import logging
+from .outbox import queue_email
 get_from_email = settings.EMAIL_HOST_USER
 business_name = settings.BUSINESS_NAME
 business_logo = settings.BUSINESS_LOGO
 contact_email = settings.CONTACT_EMAIL
 from_email = business_name + "<" + get_from_email + ">"
 
-# Create a ThreadPoolExecutor for managing threads
-executor = ThreadPoolExecutor(max_workers=5)  # You can adjust the number of workers
+logger = logging.getLogger(__name__)
 
-# Define a function to send email notifications asynchronously
+# Define a function to queue the signup emails; send_outbox delivers them
 def send_email_notifications(profile, instance, created, new_email):
     if created or (profile.email_verified is False and profile.user.email is not None):
-        send_email_verification(profile, new_email=new_email)
+        try:
+            send_email_verification(profile, new_email=new_email)
+        except Exception:
+            logger.exception("Could not queue the verification email for %s", instance)
 
-        # Send notification email to admin email address.
+        # Notify the admin email address.
         title = "New User Created"
         details = f"A new user ({instance}) just created an account on {business_name}, go to the admin dashboard to create a deposit wallet for this user."
-        send_mail(
-            title, 
-            details, 
-            from_email, 
-            [contact_email],
-            fail_silently=False,
-        )
-
+        queue_email(title, details, [contact_email], from_email=from_email)
 
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
-    profile, _ = Profile.objects.get_or_create(user=instance)
-    
-    # Explicitly set the verification_token for new profiles
+def provision_or_sync_user(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
     if created:
-        profile.verification_token = profile.generate_verification_token()
-        profile.save()
-
-        # Submit the email sending task to the ThreadPoolExecutor
-        executor.submit(send_email_notifications, profile, instance, created, instance.email)
-    
-    # If the user is updated, save the profile
-    elif not created:
-        instance.profile.save()
-
-
+        profile = provision_user(instance)
+        # Queue once the new rows are committed.
+        transaction.on_commit(lambda: send_email_notifications(profile, instance, created, instance.email))
+        return
+    # Saves such as last_login updates leave the profile untouched; only a
+    # username or email change needs the login handles refreshed.
+    if update_fields is None or {'username', 'email'} & set(update_fields):
+        sync_user_handles(instance)
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user_handles(sender, instance, **kwargs):
+    # The handle rows cascade away; drop the cached id so the name resolves to nobody.
+    username_resolver.forget(instance.username)
 
 def send_email_verification(profile, new_email=None):
     user_name = profile.user.username
@@ -70,17 +66,11 @@ def send_email_verification(profile, new_email=None):
         'business_logo': business_logo,
         'base_url': base_url,
     }
-    html_message = render_to_string('email_templates/verification_email.html', context)
     details = f"Hi {user_name} Click the link below to verify your email {verification_url}"
     to_email = new_email or profile.user.email 
-    send_mail(
-            title,
-            details,
-            from_email,
-            [to_email],
-            fail_silently=False,
-            html_message=html_message,
-        )
+    if not to_email:
+        return
+    queue_email(title, details, [to_email], 'email_templates/verification_email.html', context, from_email)
 
 def send_password_reset_email(user, profile, token):
     base_url = settings.BASE_URL.rstrip('/')
@@ -88,7 +78,7 @@ def send_password_reset_email(user, profile, token):
     reset_link = f"{base_url}{reset_link}"
     title = 'Password Reset'
     context = {
-        'user_name': user,
+        'user_name': str(user),
         'reset_link': reset_link,
         'business_name': business_name,
         'contact_email': contact_email,
@@ -96,58 +86,23 @@ def send_password_reset_email(user, profile, token):
         'business_logo': business_logo,
         'base_url': base_url,
     }
-    html_message = render_to_string('email_templates/password_reset.html', context)
     details = f'Click the following link to reset your password: {reset_link}'
-    send_mail(
-        title,
-        details,
-        from_email,
-        [user.email],
-        fail_silently=False,
-        html_message=html_message,
-    )    
-
-@receiver(post_save, sender=User)
-def create_phone_when_user_is_created(sender, instance, created, **kwargs):
-    if created:
-        Phone.objects.create(user=instance)
-
-
-def log_user_login_task(user, ip_address, browser_info, device_info, failed_login_attempts):
-    UserActivity.objects.create(
-        user=user,
-        ip_address=ip_address,
-        browser_info=browser_info,
-        device_info=device_info,
-        failed_login_attempts=failed_login_attempts,
-        login_successful=True
-    )
+    queue_email(title, details, [user.email], 'email_templates/password_reset.html', context, from_email)
 
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
     try:
         ip_address = request.META.get('REMOTE_ADDR')
         browser_info = request.META.get('HTTP_USER_AGENT')
-        user_agent = parse(request.META.get('HTTP_USER_AGENT', ''))
-        device_info = user_agent.device.family
+        device_info = parse_user_agent(request.META.get('HTTP_USER_AGENT', '')).device
         failed_login_attempts = user.profile.failed_login_attempts
 
-        # Run the logging task in a separate thread
-        threading.Thread(target=log_user_login_task, args=(user, ip_address, browser_info, device_info, failed_login_attempts)).start()
+        # Queued for the batched writer; no thread or query per login
+        activity_writer.record_login(user.id, ip_address, browser_info, device_info, failed_login_attempts)
     except Exception as e:
         print(f"Error logging user activity: {e}")
 
 @receiver(user_logged_out)
 def log_user_logout(sender, request, user, **kwargs):
-    try:
-        last_activity = UserActivity.objects.filter(user=user).latest('login_time')
-        last_activity.logout_time = timezone.now()
-        last_activity.session_duration = last_activity.logout_time - last_activity.login_time
-        last_activity.save()
-    except UserActivity.DoesNotExist:
-        pass
-
-@receiver(post_save, sender=User)
-def create_billing_address(sender, instance, created, **kwargs):
-    if created:
-        BillingAddress.objects.create(user=instance)
\ No newline at end of file
+    if user is not None:
+        activity_writer.record_logout(user.id)
@@ -1,3 +1,177 @@
 from django.test import TestCase
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from .models import BillingAddress, EmailOutbox, Phone, Profile, UserActivity, UserHandle
+from .activity import UserActivityWriter
+from .utils import parse_user_agent, user_agent_cache_stats
+from .handles import username_resolver
+from .provisioning import provision_users
+from .outbox import queue_email, send_outbox_batch
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+from io import StringIO
+from unittest import mock
+
+class EmailOrUsernameBackendTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('Alice', 'Alice@Example.com', 'secret-pass')
+
+    def test_login_by_username_or_email_any_case(self):
+        self.assertEqual(authenticate(username='alice', password='secret-pass'), self.user)
+        self.assertEqual(authenticate(username=' ALICE@example.com', password='secret-pass'), self.user)
+        self.assertIsNone(authenticate(username='alice', password='wrong'))
+
+    def test_one_lookup_per_attempt(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(authenticate(username='nobody', password='secret-pass'))
+        with self.assertNumQueries(1):
+            self.assertIsNone(authenticate(username='alice', password='wrong'))
+
+    def test_handles_follow_username_and_email_changes(self):
+        self.user.username = 'Alicia'
+        self.user.email = ''
+        self.user.save()
+        self.assertEqual(
+            list(UserHandle.objects.filter(user=self.user).values_list('kind', 'value')),
+            [(UserHandle.USERNAME, 'alicia')],
+        )
+        self.assertIsNone(authenticate(username='alice@example.com', password='secret-pass'))
+
+    def test_inactive_user_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(authenticate(username='alice', password='secret-pass'))
+
+class UsernameResolverTest(TestCase):
+
+    def setUp(self):
+        username_resolver.clear()
+        self.users = [User.objects.create_user(f'Student{i}') for i in range(3)]
+
+    def test_resolve_many_in_one_query(self):
+        with self.assertNumQueries(1):
+            resolved = username_resolver.resolve_many(['@student0', 'STUDENT1', 'student2', 'ghost'])
+        self.assertEqual(resolved, {f'student{i}': user.id for i, user in enumerate(self.users)})
+        with self.assertNumQueries(0):
+            self.assertEqual(username_resolver.resolve('Student1'), self.users[1].id)
+
+    def test_rename_drops_cached_entry(self):
+        username_resolver.resolve('student0')
+        self.users[0].username = 'renamed'
+        self.users[0].save()
+        self.assertIsNone(username_resolver.resolve('student0'))
+        self.assertEqual(username_resolver.resolve('renamed'), self.users[0].id)
+
+    def test_delete_drops_cached_entry(self):
+        username_resolver.resolve('student0')
+        self.users[0].delete()
+        self.assertIsNone(username_resolver.resolve('student0'))
+
+class UserProvisioningTest(TestCase):
+
+    def test_new_user_gets_dependent_rows(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            user = User.objects.create_user('fresh', 'fresh@example.com', 'pass')
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(Profile.objects.filter(user=user).exists())
+        self.assertTrue(Phone.objects.filter(user=user).exists())
+        self.assertTrue(BillingAddress.objects.filter(user=user).exists())
+        self.assertEqual(UserHandle.objects.filter(user=user).count(), 2)
+
+    def test_later_saves_skip_the_profile(self):
+        user = User.objects.create_user('steady', 'steady@example.com', 'pass')
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+        with self.assertNumQueries(2):
+            user.first_name = 'Steady'
+            user.save()
+
+    def test_bulk_provisioning_is_idempotent(self):
+        User.objects.bulk_create([User(username=f'import{i}', email=f'import{i}@example.com') for i in range(5)])
+        users = list(User.objects.filter(username__startswith='import'))
+        with self.assertNumQueries(5):
+            provision_users(users)
+        provision_users(users)
+        self.assertEqual(Profile.objects.filter(user__in=users).count(), 5)
+        self.assertEqual(UserHandle.objects.filter(user__in=users).count(), 10)
+
+class EmailOutboxTest(TestCase):
+
+    def test_signup_only_queues_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user('mailme', 'mailme@example.com', 'pass')
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertTrue(EmailOutbox.objects.filter(subject='New User Created').exists())
+
+    def test_batch_shares_one_connection(self):
+        for i in range(3):
+            queue_email(f'Hello {i}', 'body', [f'user{i}@example.com'], from_email='noreply@example.com')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as opened:
+            call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.SENT).count(), 3)
+
+    def test_failures_back_off_then_give_up(self):
+        item = queue_email('Broken', 'body', ['x@example.com'], html_template='missing.html', from_email='noreply@example.com')
+        self.assertEqual(send_outbox_batch(), (0, 1))
+        item.refresh_from_db()
+        self.assertEqual(item.attempts, 1)
+        self.assertGreater(item.next_attempt_at, timezone.now())
+        self.assertEqual(send_outbox_batch(), (0, 0))
+
+        EmailOutbox.objects.filter(pk=item.pk).update(attempts=5, next_attempt_at=timezone.now())
+        send_outbox_batch()
+        item.refresh_from_db()
+        self.assertEqual(item.status, EmailOutbox.FAILED)
+
+class UserActivityWriterTest(TestCase):
+
+    def setUp(self):
+        self.writer = UserActivityWriter()
+        start = mock.patch.object(self.writer, 'start')
+        start.start()
+        self.addCleanup(start.stop)
+        self.users = [User.objects.create_user(f'active{i}') for i in range(3)]
+
+    def test_logins_and_logouts_flush_in_batch(self):
+        for user in self.users:
+            self.writer.record_login(user.id, '203.0.113.5', 'UA', 'PC', 0)
+        self.writer.record_logout(self.users[0].id)
+        self.assertFalse(UserActivity.objects.exists())
+
+        # savepoint, bulk insert, latest-session lookup, bulk update, release
+        with self.assertNumQueries(5):
+            self.assertEqual(self.writer.flush(), 4)
+        self.assertEqual(UserActivity.objects.count(), 3)
+        closed = UserActivity.objects.get(user=self.users[0])
+        self.assertIsNotNone(closed.logout_time)
+        self.assertIsNotNone(closed.session_duration)
+        self.assertEqual(self.writer.metrics()['written'], 4)
+
+    def test_full_queue_drops_and_counts(self):
+        with mock.patch.object(UserActivityWriter, 'max_queue_size', 2):
+            writer = UserActivityWriter()
+        with mock.patch.object(writer, 'start'):
+            for _ in range(3):
+                writer.record_logout(self.users[0].id)
+        metrics = writer.metrics()
+        self.assertEqual((metrics['enqueued'], metrics['dropped'], metrics['queue_depth']), (2, 1, 2))
+
+class UserAgentParsingTest(TestCase):
+
+    UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+    def setUp(self):
+        parse_user_agent.cache_clear()
+
+    def test_repeat_strings_hit_the_cache(self):
+        first = parse_user_agent(self.UA)
+        self.assertEqual(first.browser, 'Chrome 120.0.0')
+        self.assertEqual(first.os, 'Windows 10')
+        self.assertIs(parse_user_agent(self.UA), first)
+        stats = user_agent_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
 
-# Create your tests here.
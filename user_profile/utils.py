@@ -1,5 +1,7 @@
 import uuid
+from collections import namedtuple
 from datetime import timedelta
+from functools import lru_cache
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.urls import reverse
@@ -36,14 +38,38 @@ def is_password_reset_token_valid(profile):
         return timezone.now() <= expiration_time
     return False
 
+UserAgentInfo = namedtuple("UserAgentInfo", ["browser", "os", "device"])
+
+@lru_cache(maxsize=1024)
+def parse_user_agent(ua_string):
+    """
+    Browser, OS and device strings for a User-Agent header. The regex-heavy
+    user_agents.parse runs once per distinct string; the few hundred UAs
+    that recur constantly are answered from a bounded LRU.
+    """
+    user_agent = parse(ua_string)
+    return UserAgentInfo(
+        f"{user_agent.browser.family} {user_agent.browser.version_string}",
+        f"{user_agent.os.family} {user_agent.os.version_string}",
+        user_agent.device.family if user_agent.device.family else 'Unknown',
+    )
+
+def user_agent_cache_stats():
+    info = parse_user_agent.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
 def log_login_info(user, request):
     from .models import UserActivity
     last_login = user.last_login or timezone.now()
     ip_address = get_client_ip(request)
-    user_agent = parse(request.META.get('HTTP_USER_AGENT', ''))
-    browser_info = f"{user_agent.browser.family} {user_agent.browser.version_string}"
-    os_info = f"{user_agent.os.family} {user_agent.os.version_string}"
-    device_info = user_agent.device.family if user_agent.device.family else 'Unknown'
+    browser_info, os_info, device_info = parse_user_agent(request.META.get('HTTP_USER_AGENT', ''))
     login_duration = timezone.now() - last_login if last_login else None
 
     try: